@@ -0,0 +1,244 @@
+"""Micro-benchmarks of the overhead of octopipes itself, on synthetic no-op and numpy steps.
+
+    python -m benchmarks.overhead                  # runs the cases and compares them to benchmarks/baseline.json
+    python -m benchmarks.overhead --save           # runs the cases and saves them as the new baseline
+    python -m benchmarks.overhead -k workflow      # runs the cases whose name contains 'workflow'
+
+Times are the best of `repeat` measurements in nanoseconds per operation (step, call, run or sample).
+The process exits with 1 if a case is slower than its baseline by more than `threshold`."""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from octopipes.aggregate_flows import AggregateFlows
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.workflow import Workflow, compile_requires
+
+BASELINE = Path(__file__).parent / 'baseline.json'
+
+
+@dataclass
+class Case:
+    name: str
+    # operation a time is given per: 'step', 'call', 'run' or 'sample'
+    unit: str
+    # returns the function to time and the number of operations it runs
+    setup: Callable[[], tuple[Callable[[], object], int]]
+    # slow cases are timed with a single call per measurement
+    slow: bool = False
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, unit: str, slow: bool = False):
+    def register(setup):
+        CASES.append(Case(name, unit, setup, slow))
+        return setup
+    return register
+
+
+def noop(x):
+    return x
+
+
+def add_one(x):
+    return np.add(x, 1)
+
+
+def chain(nsteps: int, process: Callable = noop) -> Workflow:
+    workflow = Workflow('bench')
+    for _ in range(nsteps):
+        workflow.add(process)
+    return workflow
+
+
+def consume(run):
+    for _ in run:
+        pass
+    return run
+
+
+@case('workflow_next_noop', 'step')
+def workflow_next_noop():
+    workflow = chain(100)
+    return lambda: consume(workflow(0)), 100
+
+
+@case('workflow_next_numpy', 'step')
+def workflow_next_numpy():
+    workflow = chain(100, add_one)
+    array = np.zeros(64)
+    return lambda: consume(workflow(array)), 100
+
+
+@case('compiled_noop', 'step')
+def compiled_noop():
+    compiled = chain(100).compile()
+    return lambda: compiled(0), 100
+
+
+@case('compiled_requires', 'step')
+def compiled_requires():
+    workflow = Workflow('bench').add(noop)
+    for step in range(1, 100):
+        workflow.add(lambda x, first, dependency: x, requires=f'0,d0,{step}')
+    compiled = workflow.compile()
+    return lambda: compiled(0, [0]), 100
+
+
+@case('workflow_next_requires', 'step')
+def workflow_next_requires():
+    workflow = Workflow('bench').add(noop)
+    for step in range(1, 100):
+        workflow.add(lambda x, first, dependency: x, requires=f'0,d0,{step}')
+    return lambda: consume(workflow(0, dependencies=[0])), 100
+
+
+@case('compile_requires', 'call')
+def compile_requires_case():
+    return lambda: compile_requires('0,d1,2,d0,3', 4), 1
+
+
+@case('gather', 'call')
+def gather():
+    run = consume(chain(4)(0, dependencies=[1, 2]))
+    plan = compile_requires('0,d1,2,d0,3', 4)
+    return lambda: run._gather(plan), 1
+
+
+@case('freeze_results', 'run')
+def freeze_results():
+    run = consume(chain(10)(0))
+    return lambda: run.freeze(), 1
+
+
+@case('freeze_lazy', 'run')
+def freeze_lazy():
+    run = consume(chain(10)(0))
+    return lambda: run.freeze(lazy=True), 1
+
+
+def aggregate(progress: bool):
+    workflows = [chain(10), chain(10)]
+
+    def run():
+        flows = AggregateFlows(0, workflows)
+        flows.progress = progress
+        # the bars are drawn on stderr, they are measured but not shown
+        with contextlib.redirect_stderr(io.StringIO()):
+            flows.run_workflows()
+    return run, 1
+
+
+@case('aggregate_flows_tqdm', 'sample')
+def aggregate_flows_tqdm():
+    return aggregate(progress=True)
+
+
+@case('aggregate_flows_no_progress', 'sample')
+def aggregate_flows_no_progress():
+    return aggregate(progress=False)
+
+
+def benchmark(nsamples: int, batch_size: int, processes: int | None = None, chunksize: int = 1):
+    workflows = [chain(10), chain(10)]
+
+    def run():
+        Benchmark(dataloader=Dataloader(dataset=list(range(nsamples)), batch_size=batch_size), workflows=workflows,
+                  processes=processes, chunksize=chunksize, progress=False).run_tests()
+    return run, nsamples
+
+
+for batch_size in (4, 16):
+    case(f'benchmark_batches[batch_size={batch_size}]', 'sample', slow=True)(
+        lambda batch_size=batch_size: benchmark(64, batch_size))
+
+for chunksize in (1, 16):
+    case(f'benchmark_persistent[chunksize={chunksize}]', 'sample', slow=True)(
+        lambda chunksize=chunksize: benchmark(256, 16, processes=2, chunksize=chunksize))
+
+
+def measure(case: Case, repeat: int = 5) -> float:
+    """Returns the best time of the case in nanoseconds per operation"""
+    function, operations = case.setup()
+    timer = timeit.Timer(function)
+    number = 1 if case.slow else timer.autorange()[0]
+    best = min(timer.repeat(repeat=repeat if not case.slow else max(repeat // 2, 1), number=number))
+    return best / number / operations * 1e9
+
+
+def run(pattern: str | None = None, repeat: int = 5) -> dict[str, dict]:
+    results = {}
+    for case in CASES:
+        if pattern is not None and pattern not in case.name:
+            continue
+        results[case.name] = {'ns': round(measure(case, repeat), 1), 'unit': case.unit}
+        print(f'{case.name:40} {results[case.name]["ns"]:14.1f} ns/{case.unit}', file=sys.stderr)
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Returns the cases slower than their baseline by more than `threshold` (0.2 is 20%)"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['ns'] / baseline[name]['ns']
+        if ratio > 1 + threshold:
+            regressions.append(f'{name}: {result["ns"]:.1f} ns/{result["unit"]} is {ratio:.2f}x '
+                               f'the baseline ({baseline[name]["ns"]:.1f})')
+    return regressions
+
+
+def save(results: dict[str, dict], path: str | os.PathLike):
+    with open(path, 'w') as file:
+        json.dump({'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                               'processor': platform.processor(), 'cpus': os.cpu_count(),
+                               'date': time.strftime('%Y-%m-%d')},
+                   'cases': results}, file, indent=2)
+        file.write('\n')
+
+
+def load(path: str | os.PathLike) -> dict[str, dict]:
+    with open(path) as file:
+        return json.load(file)['cases']
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='pattern', help='only run the cases whose name contains it')
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements of every case')
+    parser.add_argument('--baseline', default=BASELINE, help='baseline file the results are compared to')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown flagged as a regression')
+    parser.add_argument('--save', action='store_true', help='saves the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.pattern, args.repeat)
+    if args.save:
+        baseline = load(args.baseline) if args.pattern is not None and os.path.exists(args.baseline) else {}
+        save({**baseline, **results}, args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}, run with --save to create it', file=sys.stderr)
+        return 0
+    regressions = compare(results, load(args.baseline), args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION {regression}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
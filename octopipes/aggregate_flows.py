@@ -1,11 +1,12 @@
 import logging
 from collections.abc import Callable
-from typing import Protocol
+from typing import Any, Protocol
 
 from tqdm import tqdm
 
 from octopipes.dataset import InputWithDeps
-from octopipes.results import Results
+from octopipes.results import LazyResults, Results
+from octopipes.tracing import tracer
 from octopipes.workflow import Workflow
 
 logger = logging.getLogger(__name__)
@@ -13,18 +14,38 @@ logger = logging.getLogger(__name__)
 class AggregateFlows:
     """AggregateFlows enables running multiple workflows on the same input"""
 
-    def __init__(self, input, workflows: list[Workflow], dependencies: list | None = None):
+    def __init__(self, input, workflows: list[Workflow], dependencies: list | None = None, share_prefixes: bool = False,
+                 lazy: bool = False, compact: bool = False, copy_shared: Callable[[Any], Any] | None = None):
         """Constructor of AggregateFlows
 
         :param Any input: input to the workflows to run.
         :param list[Workflow] workflows: list of workflows to run.
         :param list | None dependencies: list of dependencies that the workflows need.
+        :param bool share_prefixes: if set, the first steps shared by several workflows (same process objects and requires)
+                                    run only once, and their output and duration are recorded in every workflow.
+                                    The workflows then get the same output objects, which the next steps must not mutate.
+        :param bool lazy: if set, the results are `LazyResults` whose handler based fields are computed on demand.
+        :param bool compact: if set, the compact encoding of the outputs is computed when they are frozen
+                             (e.g. for sinks with `compact=True`). `LazyResults` compute it on demand anyway.
+        :param Callable | None copy_shared: with `share_prefixes`, called on the output of a shared step for every workflow
+                                            but the first one, e.g. `copy.deepcopy` when the next steps mutate their input.
         """
         self.input = input
         self.dependencies = dependencies
         self.workflows = workflows
-        self.results: list[Results] = []
+        self.share_prefixes = share_prefixes
+        self.lazy = lazy
+        self.compact = compact
+        self.copy_shared = copy_shared
+        self.results: list[Results | LazyResults] = []
         self._hooks = []
+        # progress bars of the steps and workflows, replaced by the counters of `reporter` if it is set
+        self.progress = True
+        self.reporter = None
+        # ground truth of the input, set by `Benchmark` when it evaluates the results and the sample has one
+        self.ground_truth = None
+        # events traced in a worker, shipped to the parent with the results (see `octopipes.tracing`)
+        self.trace = None
 
     def add_hook(self, hook: Callable):
         """Adds a hook for post-workflow callbacks"""
@@ -39,14 +60,25 @@ class AggregateFlows:
 
     def run_hooks(self, workflow):
         for hook in self._hooks:
-            self._run_hook(hook, workflow)
-
-    def _run(self, workflow: Workflow) -> Results:
+            if tracer.enabled:
+                with tracer.span(getattr(hook, '__name__', type(hook).__name__), 'hook',
+                                 {'workflow': workflow.workflow.name}):
+                    self._run_hook(hook, workflow)
+            else:
+                self._run_hook(hook, workflow)
+
+    def _run(self, workflow: Workflow) -> Results | LazyResults:
         wf_iter = workflow(self.input, dependencies=self.dependencies)
-        for _ in tqdm(wf_iter, desc=f'{workflow.name} Steps', leave=False):
+        if self.reporter is not None:
+            steps = self.reporter.track_steps(wf_iter)
+        elif self.progress:
+            steps = tqdm(wf_iter, desc=f'{workflow.name} Steps', leave=False)
+        else:
+            steps = wf_iter
+        for _ in steps:
             pass
 
-        result = wf_iter.freeze()
+        result = wf_iter.freeze(lazy=self.lazy, compact=self.compact)
         self.results.append(result)
 
         # running hooks
@@ -54,23 +86,111 @@ class AggregateFlows:
         return result
 
     def run_workflows(self):
-        for wf in tqdm(self.workflows, desc='workflows', leave=False):
+        if self.share_prefixes:
+            self._run_shared()
+            return
+        workflows = self.workflows
+        if self.progress and self.reporter is None:
+            workflows = tqdm(workflows, desc='workflows', leave=False)
+        for wf in workflows:
             self._run(wf)
 
+    def _run_shared(self):
+        runs = [iter(wf(self.input, dependencies=self.dependencies)) for wf in self.workflows]
+        self._run_prefixes(runs, self.copy_shared)
+        for wf_iter in runs:
+            if self.reporter is not None:
+                self.reporter.add_steps(wf_iter.current_step)
+            self.results.append(wf_iter.freeze(lazy=self.lazy, compact=self.compact))
+            self.run_hooks(wf_iter)
+
+    @staticmethod
+    def _run_prefixes(runs: list[Workflow.WorkflowIter], copy: Callable[[Any], Any] | None = None):
+        # `runs` have the same history, this walks down the trie of their steps:
+        # a step shared by several runs is run once and the runs branch where their steps differ.
+        while runs:
+            branches: dict[tuple, list[Workflow.WorkflowIter]] = {}
+            for wf_iter in runs:
+                if wf_iter.current_step < wf_iter.workflow.nsteps:
+                    branches.setdefault(wf_iter.workflow.step_key(wf_iter.current_step), []).append(wf_iter)
+
+            for branch in branches.values():
+                leader, *followers = branch
+                _, output = next(leader)
+                for wf_iter in followers:
+                    wf_iter._record(output if copy is None else copy(output), leader.durations[-1], leader.cache_hits[-1], leader.step_metrics[-1])
+
+            if len(branches) != 1:
+                for branch in branches.values():
+                    AggregateFlows._run_prefixes(branch, copy)
+                return
+            runs = next(iter(branches.values()))
+
+    @staticmethod
+    def merge(parts: list['AggregateFlows']) -> 'AggregateFlows':
+        """Merges flows that ran different workflows on the same input into a single one.
+        The workflows and results are kept in the order of `parts`."""
+        merged = parts[0]
+        merged.workflows = [wf for part in parts for wf in part.workflows]
+        merged.results = [result for part in parts for result in part.results]
+        merged.trace = [event for part in parts for event in part.trace] if merged.trace is not None else None
+        return merged
+
 
 class AggregateFlowsFactory(Protocol):
     def get_aggregate_flows(self, input, workflows) -> AggregateFlows: # type: ignore
         pass
 
+    def init_worker(self, workflows: list[Workflow]) -> list[Workflow]: # type: ignore
+        pass
+
 class DefaultAggregateFlowsFactory:
-    def __init__(self, hooks: list[Callable]):
+    def __init__(self, hooks: list[Callable],
+                 initializer: Callable[[list[Workflow]], list[Workflow] | None] | None = None,
+                 dependencies: list | Callable[[], list] | None = None,
+                 share_prefixes: bool = False, lazy: bool = False, compact: bool = False,
+                 copy_shared: Callable[[Any], Any] | None = None):
+        """Constructor of DefaultAggregateFlowsFactory
+
+        :param list[Callable] hooks: post-workflow hooks added to every `AggregateFlows`.
+        :param Callable | None initializer: called once per worker process with the workflows to run,
+                                            it can load models and return the workflows to install in the worker.
+        :param list | Callable | None dependencies: dependencies of the inputs that do not provide their own.
+                                                    If callable, it is called once per worker to load them.
+        :param bool share_prefixes: run the steps shared by the first steps of the workflows only once (see `AggregateFlows`).
+        :param bool lazy: freeze the runs into `LazyResults` (see `AggregateFlows`).
+        :param bool compact: compute the compact encoding of the outputs when they are frozen (see `AggregateFlows`).
+        :param Callable | None copy_shared: copies the outputs of the shared steps (see `AggregateFlows`).
+        """
         self.hooks = hooks
+        self.initializer = initializer
+        self.dependencies = dependencies
+        self.share_prefixes = share_prefixes
+        self.lazy = lazy
+        self.compact = compact
+        self.copy_shared = copy_shared
+
+    def init_worker(self, workflows: list[Workflow]) -> list[Workflow]:
+        """Prepares a worker before it runs any sample and returns the workflows it should use"""
+        if self.initializer is not None:
+            workflows = self.initializer(workflows) or workflows
+        self._load_dependencies()
+        return workflows
+
+    def _load_dependencies(self) -> list | None:
+        if callable(self.dependencies):
+            self.dependencies = self.dependencies()
+        return self.dependencies
 
     def get_aggregate_flows(self, input, workflows) -> AggregateFlows:
         # If the input is of InputWithDeps, you should split the input and inject the dependencies.
         if type(input) == InputWithDeps:
-            aggr = AggregateFlows(input.input, dependencies=input.dependencies, workflows=workflows)
+            aggr = AggregateFlows(input.input, dependencies=input.dependencies, workflows=workflows,
+                                  share_prefixes=self.share_prefixes, lazy=self.lazy, compact=self.compact,
+                                  copy_shared=self.copy_shared)
         else:
-            aggr = AggregateFlows(input, workflows=workflows)
+            aggr = AggregateFlows(input, dependencies=self._load_dependencies(), workflows=workflows,
+                                  share_prefixes=self.share_prefixes, lazy=self.lazy, compact=self.compact,
+                                  copy_shared=self.copy_shared)
         aggr.add_hooks(self.hooks)
         return aggr
@@ -0,0 +1,147 @@
+"""Dataset backed by memory-mapped array stores (`.npy` files or raw binary files)"""
+import functools
+import json
+import os
+import pathlib
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+from octopipes.dataset import InputWithDeps
+
+
+@functools.lru_cache(maxsize=64)
+def _mapping(path: str, mode: str, dtype: str, shape: tuple[int, ...], offset: int) -> np.memmap:
+    # one mapping per file and process, the pages are shared through the page cache of the host
+    return np.memmap(path, dtype=np.dtype(dtype), mode=mode, offset=offset, shape=shape)
+
+
+def _mapped_sample(path: str, mode: str, dtype: str, shape: tuple[int, ...], offset: int, index: int) -> Any:
+    return MappedArray._view(_mapping(path, mode, dtype, shape, offset), (path, mode, dtype, shape, offset), index)
+
+
+class MappedArray(np.ndarray):
+    """Zero-copy view of a sample of a memory-mapped store. It is pickled as a reference to the store
+    (path and index) so that the processes receiving it map the same file instead of copying its data.
+    Arrays derived from it (operations, slices) are regular arrays that are pickled by value."""
+
+    _source: tuple | None = None
+
+    @classmethod
+    def _view(cls, mapping: np.memmap, store: tuple, index: int) -> Any:
+        if mapping.ndim == 1:
+            # samples of one dimensional stores are scalars
+            return mapping[index]
+        array = np.ndarray.__getitem__(mapping, index).view(np.ndarray).view(cls)
+        array._source = (*store, index)
+        return array
+
+    def __array_finalize__(self, obj):
+        self._source = None
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        result = np.asarray(array)
+        return result[()] if return_scalar else result
+
+    def __reduce__(self):
+        if self._source is None:
+            return np.asarray(self).__reduce__()
+        return _mapped_sample, self._source
+
+
+def _open_store(path: str | pathlib.Path, mode: str, dtype=None, shape: tuple[int, ...] | None = None,
+                offset: int = 0) -> tuple[np.memmap, tuple]:
+    """Maps a `.npy` file, or a raw file of `dtype` samples of `shape` starting at `offset` bytes"""
+    path = str(pathlib.Path(path).resolve())
+    if path.endswith('.npy'):
+        array = np.load(path, mmap_mode='r')
+        if not array.flags.c_contiguous:
+            raise ValueError(f'{path} is not stored in C order and cannot be mapped sample by sample')
+        dtype, full_shape, offset = array.dtype, array.shape, array.offset
+    else:
+        if dtype is None or shape is None:
+            raise ValueError(f'dtype and shape of the samples are needed to map the raw file {path}')
+        dtype = np.dtype(dtype)
+        sample_bytes = dtype.itemsize * int(np.prod(shape))
+        count = (os.path.getsize(path) - offset) // sample_bytes
+        full_shape = (count, *shape)
+    store = (path, mode, np.dtype(dtype).str, tuple(full_shape), offset)
+    return _mapping(*store), store
+
+
+def _load_sidecar(source) -> Any:
+    """Loads a ground truth or dependencies sidecar: a `.npy` file is mapped, a `.json` file holds a list
+    and a `.jsonl` file a value per line. Other values are used as they are."""
+    if not isinstance(source, (str, pathlib.Path)):
+        return source
+    path = pathlib.Path(source)
+    if path.suffix == '.npy':
+        return ArrayDataset(path)
+    if path.suffix == '.jsonl':
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+    with open(path) as file:
+        return json.load(file)
+
+
+class ArrayDataset:
+    """ArrayDataset reads its samples from a memory-mapped array store, the first axis indexing the samples.
+    Samples are zero-copy views of the file: the workers of a `Benchmark` running on the same host share the
+    page-cached data instead of each reading and decoding it.
+
+    If `ground_truth` is given, samples are `(input, ground_truth)` tuples. If `dependencies` are given,
+    inputs are `InputWithDeps` whose dependencies are the items of every dependency source at the same index."""
+
+    def __init__(self, path: str | pathlib.Path, dtype=None, shape: tuple[int, ...] | None = None, offset: int = 0,
+                 ground_truth=None, dependencies: Sequence[Any] | None = None, mode: str = 'c') -> None:
+        """Constructor of ArrayDataset
+
+        :param str | Path path: `.npy` file or raw binary file of the samples.
+        :param dtype: dtype of a raw file, ignored for `.npy` files.
+        :param tuple | None shape: shape of a sample of a raw file, ignored for `.npy` files.
+        :param int offset: bytes to skip at the start of a raw file.
+        :param ground_truth: `.npy`, `.json` or `.jsonl` sidecar file, or a sequence, of the ground truths.
+        :param Sequence | None dependencies: sidecar files or sequences of the dependencies of the samples.
+        :param str mode: mode of the mapping. 'c' (copy-on-write) lets workflows modify the samples in place
+            without writing to the file, 'r' makes them read-only.
+        """
+        self.path = pathlib.Path(path)
+        self.mode = mode
+        self.array, self._store = _open_store(path, mode, dtype=dtype, shape=shape, offset=offset)
+        self.ground_truth = _load_sidecar(ground_truth) if ground_truth is not None else None
+        self.dependencies = [_load_sidecar(source) for source in dependencies] if dependencies else []
+
+        for name, source in [('ground_truth', self.ground_truth), *(('dependencies', s) for s in self.dependencies)]:
+            if source is not None and len(source) != len(self):
+                raise ValueError(f'{name} has {len(source)} items but {self.path} has {len(self)} samples')
+
+    def __getstate__(self):
+        # the mapping is reopened rather than pickled with its data
+        state = dict(self.__dict__)
+        del state['array']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.array = _mapping(*self._store)
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def sample(self, index: int) -> Any:
+        input = MappedArray._view(self.array, self._store, index)
+        if self.dependencies:
+            input = InputWithDeps(input, [source[index] for source in self.dependencies])
+        if self.ground_truth is not None:
+            return input, self.ground_truth[index]
+        return input
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self.sample(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'index {index} is out of range for {len(self)} samples')
+        return self.sample(index)
@@ -1,43 +1,391 @@
-from multiprocess import Pool
-
-from tqdm import tqdm
+import logging
+import os
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Literal
 
 from octopipes.dataset import Dataloader
+from octopipes.executors import Executor, ExecutorName, get_executor
+from octopipes.progress import ProgressMonitor, ProgressReporter
 from octopipes.workflow import Workflow
 from octopipes.aggregate_flows import AggregateFlows, AggregateFlowsFactory, DefaultAggregateFlowsFactory
+from octopipes.metrics import DetectionMetrics, metrics_for
+from octopipes.sinks import ResultsSink
+from octopipes.stats import LatencyStats
+from octopipes.tracing import tracer
+from octopipes.transport import Transport
 
+logger = logging.getLogger(__name__)
 
 class Benchmark:
     def __init__(self, dataloader: Dataloader, workflows: list[Workflow],
-                 flows_factory: AggregateFlowsFactory | None = None) -> None:
+                 flows_factory: AggregateFlowsFactory | None = None,
+                 processes: int | None = None, chunksize: int = 1,
+                 schedule: Literal['sample', 'workflow'] = 'sample',
+                 initializer: Callable | None = None, initargs: tuple = (),
+                 sink: ResultsSink | None = None, window: int | None = None,
+                 transport: Transport | None = None, executor: Executor | ExecutorName = 'process',
+                 progress: bool = True, stats: LatencyStats | None = None, metrics: bool = False,
+                 trace: str | os.PathLike | None = None) -> None:
+        """Constructor of Benchmark
+
+        :param Dataloader dataloader: loader of the samples to run the workflows on.
+        :param list[Workflow] workflows: list of workflows to run on every sample.
+        :param AggregateFlowsFactory | None flows_factory: factory used to build the `AggregateFlows` of a sample.
+        :param int | None processes: number of workers of a pool kept alive for the whole run.
+                                     If None, a new pool with as many processes as the batch size is created for every batch,
+                                     except with the 'workflow' schedule that always keeps a pool of one process per CPU.
+        :param int chunksize: number of tasks sent at once to a worker of the persistent pool.
+        :param str schedule: unit of work of the persistent pool. With 'sample' a task runs all the workflows on a sample,
+                             with 'workflow' every (sample, workflow) pair is a separate task so that idle workers
+                             are not held by the slowest workflow. The tasks are scheduled from `workflows`, the workers
+                             (see `AggregateFlowsFactory.init_worker`) must install as many workflows, in the same order.
+                             Defaults to 'sample'.
+        :param Callable | None initializer: called with `initargs` once in every worker before the factory initializes it.
+        :param tuple initargs: arguments of `initializer`.
+        :param ResultsSink | None sink: sink the results are written to as soon as they are received. It is closed at the end of `run_tests`.
+        :param int | None window: maximum number of the latest `AggregateFlows` kept in `results`. If None, all of them are kept.
+        :param Transport | None transport: transport of the samples and results between the parent and the workers,
+                                           e.g. `SharedMemoryTransport` for large arrays. If None, they are pickled.
+                                           It is not used by executors sharing the memory of the caller.
+        :param Executor | str executor: backend running the workflows, 'process', 'thread', 'serial' or an `Executor`.
+                                        Defaults to 'process', `run_tests` can override it for a run.
+        :param bool progress: whether to show the progress of the run. The workers send their counts to the parent
+                              that shows a single bar, nothing is sent nor shown if unset.
+        :param LatencyStats | None stats: statistics fed with the durations of the results as they are received.
+                                          Their summary table is printed at the end of `run_tests` if `progress` is set.
+        :param bool metrics: whether to evaluate the outputs of the workflows against the ground truth of the samples
+                             as they are received, see `evaluate`. The last handler of a workflow tells the kind of
+                             its outputs (`BboxesHandler`, `CirclesHandler` or `SegmentationMasksHandler`).
+        :param str | PathLike | None trace: path of the Chrome trace (see `octopipes.tracing`) of the dataloader batches,
+                                            transport, steps, freezes and hooks written at the end of `run_tests`.
+                                            The events of the workers are shipped back with their results.
+        """
         self.dataloader = dataloader
         self.workflows = workflows
-        self.results: list[AggregateFlows] = []
+        self.results: deque[AggregateFlows] = deque(maxlen=window)
+        self.sink = sink
+        self.processes = processes
+        self.chunksize = chunksize
+        if schedule not in ('sample', 'workflow'):
+            raise ValueError(f'unknown schedule {schedule!r}')
+        self.schedule = schedule
+        self.initializer = initializer
+        self.initargs = initargs
+        self.transport = transport
+        self.executor = get_executor(executor)
+        self._executor = self.executor
+        self.progress = progress
+        self.monitor: ProgressMonitor | None = None
+        self.stats = stats
+        self.metrics: dict[str, DetectionMetrics] | None = {} if metrics else None
+        self.trace = trace
+        # samples sent to the pool and not collected yet, bounded when they are packed (see `_bounded`)
+        self._in_flight: threading.Semaphore | None = None
+        self._stopped = False
 
         self.factory: AggregateFlowsFactory = DefaultAggregateFlowsFactory(hooks=[]) if flows_factory is None else flows_factory
 
     @staticmethod
-    def run_sample(factory: AggregateFlowsFactory, workflows, sample):
+    def sample_feature(sample):
+        """Returns the input of the workflows, without the ground truth if the sample has one"""
+        if hasattr(sample, 'shape'):
+            # arrays are inputs on their own, unpacking would iterate over their first axis
+            return sample
         try:
             feature, _ = sample
         except TypeError:
             feature = sample
+        return feature
+
+    @staticmethod
+    def sample_ground_truth(sample):
+        """Returns the ground truth of the sample, None if it has none"""
+        if hasattr(sample, 'shape'):
+            return None
+        try:
+            _, ground_truth = sample
+        except TypeError:
+            return None
+        return ground_truth
+
+    @staticmethod
+    def run_sample(factory: AggregateFlowsFactory, workflows, sample, reporter: ProgressReporter | None = None,
+                   ground_truth: bool = False):
+        feature = Benchmark.sample_feature(sample)
 
         aggregate = factory.get_aggregate_flows(feature, workflows)
+        if ground_truth:
+            # only kept to evaluate the results, it would otherwise stay in the results and be shipped with them
+            aggregate.ground_truth = Benchmark.sample_ground_truth(sample)
+        # the progress of the steps is reported to the parent rather than shown by every worker
+        aggregate.progress = False
+        aggregate.reporter = reporter
+        if reporter is not None:
+            reporter.sample_started()
         aggregate.run_workflows()
+        aggregate.reporter = None
+        if reporter is not None:
+            reporter.sample_done()
         return aggregate
 
-    def run_tests(self):
-        for batch in tqdm(self.dataloader):
-            with Pool(processes=len(batch)) as pool:
-                for result in pool.map(func=Run(self.factory, self.workflows), iterable=batch):
-                    self.results.append(result)
+    def batches(self):
+        """Iterates over the batches of the dataloader, tracing the time spent waiting for them"""
+        iterator = iter(self.dataloader)
+        while True:
+            with tracer.span('batch', 'dataloader'):
+                batch = next(iterator, None)
+            if batch is None:
+                return
+            yield batch
+
+    def samples(self):
+        """Iterates over the samples of the dataloader, one at a time"""
+        for batch in self.batches():
+            yield from batch
+
+    def run_tests(self, executor: Executor | ExecutorName | None = None):
+        """Runs the workflows on all the samples
+
+        :param Executor | str | None executor: backend of this run. If None, the executor of the benchmark is used.
+        """
+        self._executor = self.executor if executor is None else get_executor(executor)
+        traced = tracer.enabled
+        if self.trace is not None:
+            tracer.enable('benchmark')
+        if self.schedule == 'workflow' and not self.workflows:
+            raise ValueError("schedule='workflow' needs the workflows to schedule, workflows is empty")
+        self._in_flight = None
+        self._stopped = False
+        self.monitor = None
+        if self.progress:
+            self.monitor = ProgressMonitor(total=self.dataloader.nsamples, shared_memory=self._executor.shares_memory)
+            self.monitor.start()
+        try:
+            if self.schedule == 'workflow':
+                self._run_workflow_tasks()
+            elif self.processes is None:
+                self._run_batches()
+            else:
+                self._run_persistent()
+        finally:
+            if self.monitor is not None:
+                self.monitor.stop()
+            if self.sink is not None:
+                self.sink.close()
+            if (release := getattr(self._transport, 'release', None)) is not None:
+                # segments packed for a sample or a result that was never received, e.g. after a worker failed
+                release()
+            if self.trace is not None:
+                tracer.save(self.trace)
+                if not traced:
+                    tracer.disable()
+                    tracer.reset()
+        if self.stats is not None and self.progress:
+            print(self.stats.table())
+
+    @property
+    def _transport(self) -> Transport | None:
+        return None if self._executor.shares_memory else self.transport
+
+    def _send(self, sample):
+        if self._transport is None:
+            return sample
+        with tracer.span('pack', 'transport'):
+            return self._transport.pack(sample)
+
+    def _receive(self, result):
+        if self._transport is None:
+            return result
+        with tracer.span('unpack', 'transport'):
+            return self._transport.unpack(result)
+
+    def _collect(self, index: int, aggregate: AggregateFlows):
+        if aggregate.trace is not None:
+            tracer.extend(aggregate.trace)
+            aggregate.trace = None
+        if self._in_flight is not None:
+            self._in_flight.release()
+        if self.sink is not None:
+            self.sink.write(index, aggregate)
+        self.results.append(aggregate)
+        if self.stats is not None:
+            self.stats.observe(aggregate)
+        if self.metrics is not None:
+            self._evaluate(aggregate)
+        if self.monitor is not None:
+            self.monitor.collected()
+
+    def _evaluate(self, aggregate: AggregateFlows):
+        if aggregate.ground_truth is None:
+            return
+        for workflow, result in zip(aggregate.workflows, aggregate.results):
+            name = workflow.metadata_name
+            if name not in self.metrics:
+                self.metrics[name] = metrics_for(workflow.handlers[-1]) if workflow.handlers else None
+            if (metrics := self.metrics[name]) is None:
+                continue
+            ground_truth = aggregate.ground_truth
+            if isinstance(ground_truth, dict) and name in ground_truth:
+                # ground truths of the different kinds of workflows by metadata_name
+                ground_truth = ground_truth[name]
+            try:
+                metrics.update(result.output, ground_truth)
+            except Exception as e:
+                # a ground truth of another kind than the outputs of the workflow must not stop the run
+                logger.warning(f'outputs of workflow {workflow.name!r} cannot be evaluated against the ground truth '
+                               f'of the sample due to {e!r}')
+
+    def evaluate(self) -> dict[str, dict]:
+        """Returns the metrics of every evaluated workflow by `metadata_name` (see `DetectionMetrics.compute`)"""
+        if self.metrics is None:
+            raise ValueError('the benchmark does not evaluate the results, set metrics=True')
+        return {name: metrics.compute() for name, metrics in self.metrics.items() if metrics is not None}
+
+    def _pool(self, workers: int | None):
+        if (ensure_tracker := getattr(self._transport, 'ensure_tracker', None)) is not None:
+            ensure_tracker()
+        reporter = self.monitor.reporter() if self.monitor is not None else None
+        # the workers of in-process executors record their events in the tracer of the parent
+        trace = self.trace is not None and not self._executor.shares_memory
+        return self._executor.pool(init_worker, (self.factory, self.workflows, self.initializer, self.initargs,
+                                                 self._transport, reporter, trace, self.metrics is not None), workers)
+
+    def _run_batches(self):
+        index = 0
+        for batch in self.batches():
+            with self._pool(len(batch)) as pool:
+                for result in pool.map(run_in_worker, [self._send(sample) for sample in batch]):
+                    self._collect(index, self._receive(result))
+                    index += 1
+
+    def _bounded(self, samples):
+        """Yields the samples once fewer than two chunks per worker are in flight. The pool consumes its tasks as
+        fast as it can, packed samples would otherwise fill the shared memory ahead of the workers."""
+        if self._transport is None:
+            return samples
+        self._in_flight = in_flight = threading.Semaphore(2 * (self.processes or os.cpu_count() or 1) * self.chunksize)
+
+        def bounded():
+            for sample in samples:
+                # the pool consumes the tasks in a thread of its own, it must not stay blocked once the run stopped
+                while not in_flight.acquire(timeout=0.1):
+                    if self._stopped:
+                        return
+                yield sample
+        return bounded()
+
+    def _run_persistent(self):
+        with self._pool(self.processes) as pool:
+            indexed = pool.imap_unordered(run_indexed_in_worker,
+                                          ((index, self._send(sample))
+                                           for index, sample in enumerate(self._bounded(self.samples()))),
+                                          chunksize=self.chunksize)
+            try:
+                for index, result in enumerate(in_order(indexed)):
+                    self._collect(index, self._receive(result))
+            finally:
+                self._stopped = True
+
+    def _run_workflow_tasks(self):
+        nworkflows = len(self.workflows)
+        # every task receives its own copy of the sample, the transport may not deliver a packed value twice
+        tasks = ((index, workflow, self._send(sample))
+                 for index, sample in enumerate(self._bounded(self.samples()))
+                 for workflow in range(nworkflows))
+        with self._pool(self.processes) as pool:
+            parts = ((index, workflow, self._receive(part)) for index, workflow, part
+                     in pool.imap_unordered(run_workflow_in_worker, tasks, chunksize=self.chunksize))
+            try:
+                for index, result in enumerate(in_order(assemble(parts, nworkflows))):
+                    self._collect(index, result)
+            finally:
+                self._stopped = True
+
+
+def in_order(indexed_results):
+    """Yields the results of `(index, result)` pairs completed in any order by increasing index"""
+    pending = {}
+    next_index = 0
+    for index, result in indexed_results:
+        pending[index] = result
+        while next_index in pending:
+            yield pending.pop(next_index)
+            next_index += 1
+
+
+def assemble(parts, nworkflows: int):
+    """Merges `(sample index, workflow index, AggregateFlows)` parts completed in any order into
+    `(sample index, AggregateFlows)` pairs as soon as all the workflows of a sample are done"""
+    pending: dict[int, dict[int, AggregateFlows]] = {}
+    for index, workflow, aggregate in parts:
+        sample_parts = pending.setdefault(index, {})
+        sample_parts[workflow] = aggregate
+        if len(sample_parts) == nworkflows:
+            del pending[index]
+            yield index, AggregateFlows.merge([sample_parts[i] for i in range(nworkflows)])
 
 
 class Run:
-    def __init__(self, factory, workflows) -> None:
+    def __init__(self, factory, workflows, transport: Transport | None = None,
+                 reporter: ProgressReporter | None = None, trace: bool = False, scheduled: int | None = None,
+                 ground_truth: bool = False) -> None:
         self.factory = factory
         self.workflows = workflows
+        self.transport = transport
+        self.reporter = reporter
+        # whether the events traced in the worker are shipped with the results. The events recorded after
+        # the last result of a worker (packing it) are not shipped.
+        self.trace = trace
+        # number of workflows of the parent, which the tasks of the 'workflow' schedule index
+        self.scheduled = len(workflows) if scheduled is None else scheduled
+        # whether the ground truth of the samples is attached to their results to evaluate them
+        self.ground_truth = ground_truth
+
+    def __call__(self, sample, workflow: int | None = None):
+        if workflow is not None and len(self.workflows) != self.scheduled:
+            raise ValueError(f'the worker installed {len(self.workflows)} workflows but {self.scheduled} are scheduled, '
+                             "the 'workflow' schedule needs the same workflows in the parent and the workers")
+        workflows = self.workflows if workflow is None else self.workflows[workflow:workflow + 1]
+        if self.transport is not None:
+            with tracer.span('unpack', 'transport'):
+                sample = self.transport.unpack(sample)
+        with tracer.span('sample', 'benchmark'):
+            aggregate = Benchmark.run_sample(self.factory, workflows, sample, self.reporter, self.ground_truth)
+        if self.trace:
+            aggregate.trace = tracer.drain()
+        if self.transport is None:
+            return aggregate
+        with tracer.span('pack', 'transport'):
+            return self.transport.pack(aggregate)
+
+
+def init_worker(factory: AggregateFlowsFactory, workflows: list[Workflow],
+                initializer: Callable | None = None, initargs: tuple = (), transport: Transport | None = None,
+                reporter: ProgressReporter | None = None, trace: bool = False, ground_truth: bool = False) -> Run:
+    """Installs the workflows in a worker, once before it runs any sample"""
+    if trace:
+        # a forked worker starts with a copy of the events of the parent
+        tracer.reset()
+        tracer.enable('worker')
+    if initializer is not None:
+        initializer(*initargs)
+    scheduled = len(workflows)
+    if (init := getattr(factory, 'init_worker', None)) is not None:
+        workflows = init(workflows)
+    return Run(factory, workflows, transport, reporter, trace, scheduled, ground_truth)
+
+
+def run_in_worker(run: Run, sample):
+    return run(sample)
+
+
+def run_indexed_in_worker(run: Run, indexed_sample):
+    index, sample = indexed_sample
+    return index, run(sample)
+
 
-    def __call__(self, sample):
-        return Benchmark.run_sample(self.factory, self.workflows, sample)
+def run_workflow_in_worker(run: Run, task):
+    index, workflow, sample = task
+    return index, workflow, run(sample, workflow)
@@ -0,0 +1,210 @@
+"""Content-addressed cache of the outputs of workflow steps"""
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+import tempfile
+import sys
+import threading
+import types
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+def hash_value(value: Any, hasher=None) -> str:
+    """Returns a digest of the content of a value. numpy arrays are hashed from their dtype, shape and bytes,
+    containers from their items and other objects from their pickled representation."""
+    hasher = hashlib.blake2b(digest_size=20) if hasher is None else hasher
+    _update(hasher, value)
+    return hasher.hexdigest()
+
+
+def _update(hasher, value: Any):
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        hasher.update(f'{type(value).__name__}:{value!r};'.encode())
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        hasher.update(b'bytes:%d;' % len(value))
+        hasher.update(value)
+    elif isinstance(value, (list, tuple)):
+        hasher.update(f'{type(value).__name__}:{len(value)};'.encode())
+        for item in value:
+            _update(hasher, item)
+    elif isinstance(value, (set, frozenset)):
+        # the order of the items of a set depends on the hash seed of the interpreter
+        hasher.update(f'{type(value).__name__}:{len(value)};'.encode())
+        for item in sorted(value, key=repr):
+            _update(hasher, item)
+    elif isinstance(value, types.CodeType):
+        _update_code(hasher, value)
+    elif isinstance(value, dict):
+        hasher.update(f'dict:{len(value)};'.encode())
+        for key in sorted(value, key=repr):
+            _update(hasher, key)
+            _update(hasher, value[key])
+    elif callable(value) and hasattr(value, '__code__'):
+        hasher.update(step_identity(value).encode())
+    elif (np := sys.modules.get('numpy')) is not None and isinstance(value, (np.ndarray, np.generic)):
+        # subclasses (e.g. `MappedArray`) are hashed from their content as well
+        array = np.ascontiguousarray(value)
+        hasher.update(f'ndarray:{array.dtype.str}:{array.shape};'.encode())
+        hasher.update(array.data if array.flags.c_contiguous else array.tobytes())
+    else:
+        hasher.update(f'{type(value).__qualname__};'.encode())
+        hasher.update(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _update_code(hasher, code: types.CodeType):
+    # nested code objects (comprehensions, inner functions) are hashed recursively, their repr holds their address.
+    hasher.update(b'code:')
+    hasher.update(code.co_code)
+    hasher.update(f'{code.co_names};'.encode())
+    for const in code.co_consts:
+        _update(hasher, const)
+
+
+def step_identity(process: Callable) -> str:
+    """Returns an identity of a process that is stable across interpreter runs.
+    It is built from its qualified name, its code, its default arguments, the values captured by its closure
+    and the object it is bound to."""
+    hasher = hashlib.blake2b(digest_size=20)
+    function = getattr(process, '__func__', process)
+    hasher.update(f'{getattr(function, "__module__", "")}.{getattr(function, "__qualname__", type(process).__qualname__)};'.encode())
+    code = getattr(function, '__code__', None)
+    if code is not None:
+        _update_code(hasher, code)
+        _update(hasher, function.__defaults__)
+        _update(hasher, function.__kwdefaults__)
+        for cell in function.__closure__ or ():
+            _update(hasher, cell.cell_contents)
+        if function is not process:
+            # bound methods of different objects compute different outputs
+            _update(hasher, process.__self__)
+    else:
+        # callable objects are identified by their state
+        _update(hasher, process)
+    return hasher.hexdigest()
+
+
+class StepCache:
+    """StepCache memoizes the outputs of steps keyed by the identity of the step and a hash of its inputs.
+    It has a LRU in-memory tier and an optional on-disk tier whose least recently used entries are evicted
+    once it grows over `max_disk_bytes`."""
+
+    def __init__(self, max_items: int = 128, directory: str | pathlib.Path | None = None,
+                 max_disk_bytes: int | None = None) -> None:
+        """Constructor of StepCache
+
+        :param int max_items: maximum number of outputs kept in memory.
+        :param str | Path | None directory: directory of the on-disk tier, disabled if None.
+        :param int | None max_disk_bytes: maximum size of the on-disk tier. If None, it is not bounded.
+        """
+        self.max_items = max_items
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(identity: str, arguments: list[Any]) -> str:
+        return hash_value(arguments, hashlib.blake2b(identity.encode(), digest_size=20))
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Returns whether the key is cached and its value"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return True, self._memory[key]
+
+        if self.directory is not None:
+            path = self.directory / f'{key}.pkl'
+            try:
+                with open(path, 'rb') as file:
+                    value = pickle.load(file)
+                os.utime(path)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return True, value
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def put(self, key: str, value: Any):
+        self._remember(key, value)
+        if self.directory is not None:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                logger.warning(f'output of cache entry {key} cannot be stored on disk due to {e}')
+                return
+            # write then rename so that other processes never read a partial entry.
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as file:
+                file.write(data)
+            os.replace(tmp, self.directory / f'{key}.pkl')
+            if self.max_disk_bytes is not None:
+                self.evict()
+
+    def _remember(self, key: str, value: Any):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_items:
+                self._memory.popitem(last=False)
+
+    def evict(self):
+        """Removes the least recently used entries of the on-disk tier until it fits in `max_disk_bytes`"""
+        if self.directory is None or self.max_disk_bytes is None:
+            return
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pkl'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.directory is not None:
+            for path in self.directory.glob('*.pkl'):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses}
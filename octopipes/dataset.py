@@ -1,4 +1,7 @@
-from dataclasses import dataclass
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import Protocol, Any
 
 
@@ -10,14 +13,45 @@ class Dataset(Protocol):
         return 0
 
 
+@dataclass
+class PrefetchStats:
+    """Statistics of a prefetching dataloader. A low mean depth (batches often not ready when requested)
+    means the run is bound by the loading of the data, a depth close to `prefetch` means it is bound by the compute."""
+    batches: int = 0
+    ready: int = 0
+    waits: int = 0
+    wait_time: float = 0.
+
+    @property
+    def mean_depth(self) -> float:
+        """Mean number of batches ready when a batch is requested"""
+        return self.ready / self.batches if self.batches else 0.
+
+
 @dataclass
 class Dataloader:
+    """Dataloader yields batches of a dataset.
+
+    If `prefetch` is set, up to `prefetch` batches are loaded ahead by `prefetch_workers` background threads,
+    the statistics of the last iteration are then available in `stats`."""
     dataset: Dataset
     batch_size: int = 1
     limit: int | None = None
     drop_last_batch: bool = False
+    prefetch: int = 0
+    prefetch_workers: int = 1
+    stats: PrefetchStats | None = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def nsamples(self) -> int:
+        """Number of samples yielded by an iteration"""
+        return DataloaderIter(self).total_yield
 
     def __iter__(self):
+        if self.prefetch > 0:
+            loader_iter = PrefetchDataloaderIter(self)
+            self.stats = loader_iter.stats
+            return iter(loader_iter)
         return iter(DataloaderIter(self))
 
 
@@ -54,6 +88,59 @@ class DataloaderIter:
         raise StopIteration
 
 
+class PrefetchDataloaderIter(DataloaderIter):
+    def __init__(self, dataloader) -> None:
+        super().__init__(dataloader)
+        self.prefetch = dataloader.prefetch
+        self.executor = ThreadPoolExecutor(max_workers=dataloader.prefetch_workers, thread_name_prefix='octopipes-prefetch')
+        self.stats = PrefetchStats()
+
+    def __iter__(self):
+        super().__iter__()
+        self.futures: deque[Future] = deque()
+        # the bounds are predicted from the size of the dataset so that batches can be loaded concurrently
+        self.next_index = 0
+        self.scheduled = 0
+        self._schedule()
+        return self
+
+    def _schedule(self):
+        while len(self.futures) < self.prefetch and self.scheduled < self.total_yield:
+            start, end = self.next_index, self.next_index + self.batch_size
+            keep = min(max(0, min(end, self.size) - start), self.total_yield - self.scheduled)
+            self.futures.append(self.executor.submit(self._load, start, end, keep))
+            self.next_index = end
+            self.scheduled += keep
+
+    def _load(self, start: int, end: int, keep: int):
+        batch = self.dataset[start:end]
+        return batch[:keep] if len(batch) > keep else batch
+
+    def __next__(self):
+        if not self.futures:
+            self.close()
+            raise StopIteration
+
+        self.stats.batches += 1
+        self.stats.ready += sum(future.done() for future in self.futures)
+        future = self.futures.popleft()
+        if not future.done():
+            self.stats.waits += 1
+            start = time.perf_counter()
+            batch = future.result()
+            self.stats.wait_time += time.perf_counter() - start
+        else:
+            batch = future.result()
+        self._schedule()
+        return batch
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def __del__(self):
+        self.close()
+
+
 @dataclass
 class InputWithDeps:
     input: Any
@@ -0,0 +1,72 @@
+"""Compact, self-describing encodings of outputs: RLE masks and base64 little-endian arrays.
+The encodings are JSON serializable dicts and are decoded back without per-element python loops."""
+import base64
+from typing import Any
+
+import numpy as np
+
+
+def encode_array(array) -> dict[str, Any]:
+    """Encodes an array as its little-endian bytes in base64 with its dtype and shape"""
+    array = np.asarray(array)
+    dtype = array.dtype.newbyteorder('<') if array.dtype.byteorder == '>' else array.dtype
+    data = np.ascontiguousarray(array, dtype=dtype)
+    return {'encoding': 'array',
+            'dtype': dtype.str,
+            'shape': list(array.shape),
+            'data': base64.b64encode(data.data).decode('ascii')}
+
+
+def decode_array(data: dict[str, Any]) -> np.ndarray:
+    buffer = base64.b64decode(data['data'])
+    return np.frombuffer(buffer, dtype=np.dtype(data['dtype'])).reshape(data['shape'])
+
+
+def rle_encode(mask) -> dict[str, Any]:
+    """Run-length encodes a boolean mask in C order. Runs alternate starting with False."""
+    mask = np.asarray(mask, dtype=bool)
+    flat = mask.ravel()
+    if flat.size == 0:
+        counts = np.zeros(0, dtype=np.uint32)
+    else:
+        changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+        counts = np.diff(np.concatenate(([0], changes, [flat.size])))
+        if flat[0]:
+            counts = np.concatenate(([0], counts))
+    return {'encoding': 'rle',
+            'shape': list(mask.shape),
+            'counts': encode_array(counts.astype(np.uint32))}
+
+
+def rle_decode(data: dict[str, Any]) -> np.ndarray:
+    counts = decode_array(data['counts'])
+    values = np.arange(len(counts)) % 2 == 1
+    return np.repeat(values, counts).reshape(data['shape'])
+
+
+def encode(value: Any) -> Any:
+    """Encodes a value recursively: boolean arrays are RLE encoded, other arrays are base64 encoded,
+    numpy scalars are converted to python ones and containers are encoded item by item."""
+    if isinstance(value, np.ndarray):
+        return rle_encode(value) if value.dtype == bool else encode_array(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    return value
+
+
+def decode(value: Any) -> Any:
+    """Decodes a value encoded with `encode` or with the encoders of this module"""
+    if isinstance(value, dict):
+        encoding = value.get('encoding')
+        if encoding == 'array':
+            return decode_array(value)
+        if encoding == 'rle':
+            return rle_decode(value)
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
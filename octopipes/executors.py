@@ -0,0 +1,132 @@
+"""Execution backends of a benchmark: a pool of processes, a pool of threads or the calling thread.
+
+A backend installs the state of its workers once with `setup(*setup_args)` and calls the tasks as `task(state, item)`."""
+import functools
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, ContextManager, Literal, Protocol
+
+
+class WorkerPool(Protocol):
+    def map(self, task: Callable, iterable: Iterable) -> list:
+        pass
+
+    def imap_unordered(self, task: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        pass
+
+
+class Executor(Protocol):
+    # whether the workers share the memory of the caller, values then do not need to be transported
+    shares_memory: bool
+
+    def pool(self, setup: Callable, setup_args: tuple, workers: int | None) -> ContextManager[WorkerPool]:
+        pass
+
+
+# State installed in the current worker process by `_install`.
+_worker_state: Any = None
+
+
+def _install(setup: Callable, setup_args: tuple):
+    global _worker_state
+
+    _worker_state = setup(*setup_args)
+
+
+def _call_in_worker(task: Callable, item):
+    return task(_worker_state, item)
+
+
+class _ProcessPool:
+    def __init__(self, pool) -> None:
+        self._pool = pool
+
+    def map(self, task: Callable, iterable: Iterable) -> list:
+        return self._pool.map(functools.partial(_call_in_worker, task), iterable)
+
+    def imap_unordered(self, task: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        return self._pool.imap_unordered(functools.partial(_call_in_worker, task), iterable, chunksize=chunksize)
+
+
+class ProcessExecutor:
+    """Runs the tasks in a pool of processes. The setup is sent once to every worker, the tasks then only carry their items.
+    Best suited to steps holding the GIL."""
+    shares_memory = False
+
+    @contextmanager
+    def pool(self, setup: Callable, setup_args: tuple, workers: int | None):
+        from multiprocess import Pool
+
+        pool = Pool(processes=workers, initializer=_install, initargs=(setup, setup_args))
+        try:
+            yield _ProcessPool(pool)
+            # the workers exit gracefully so that their finalizers (e.g. pending image writes) run.
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+
+
+class _ThreadPool:
+    def __init__(self, pool, state) -> None:
+        self._pool = pool
+        self._state = state
+
+    def map(self, task: Callable, iterable: Iterable) -> list:
+        return self._pool.map(functools.partial(task, self._state), iterable)
+
+    def imap_unordered(self, task: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        return self._pool.imap_unordered(functools.partial(task, self._state), iterable, chunksize=chunksize)
+
+
+class ThreadExecutor:
+    """Runs the tasks in a pool of threads sharing a single setup (e.g. one copy of the models).
+    Nothing is pickled, best suited to steps releasing the GIL (cv2, numpy, onnxruntime)."""
+    shares_memory = True
+
+    @contextmanager
+    def pool(self, setup: Callable, setup_args: tuple, workers: int | None):
+        from multiprocess.pool import ThreadPool
+
+        state = setup(*setup_args)
+        pool = ThreadPool(processes=workers)
+        try:
+            yield _ThreadPool(pool, state)
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+
+
+class _SerialPool:
+    def __init__(self, state) -> None:
+        self._state = state
+
+    def map(self, task: Callable, iterable: Iterable) -> list:
+        return [task(self._state, item) for item in iterable]
+
+    def imap_unordered(self, task: Callable, iterable: Iterable, chunksize: int = 1) -> Iterator:
+        return (task(self._state, item) for item in iterable)
+
+
+class SerialExecutor:
+    """Runs the tasks one after the other in the calling thread, e.g. to debug or profile workflows"""
+    shares_memory = True
+
+    @contextmanager
+    def pool(self, setup: Callable, setup_args: tuple, workers: int | None):
+        yield _SerialPool(setup(*setup_args))
+
+
+ExecutorName = Literal['process', 'thread', 'serial']
+
+_EXECUTORS = {'process': ProcessExecutor, 'thread': ThreadExecutor, 'serial': SerialExecutor}
+
+
+def get_executor(executor: Executor | ExecutorName) -> Executor:
+    """Returns the executor of a backend name, executors are returned as they are"""
+    if isinstance(executor, str):
+        if executor not in _EXECUTORS:
+            raise ValueError(f'unknown executor {executor!r}, expected one of {list(_EXECUTORS)}')
+        return _EXECUTORS[executor]()
+    return executor
@@ -2,8 +2,6 @@ import logging
 import json
 from typing import Any, Protocol
 
-import cmap
-
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +15,12 @@ class HandlerInterface(Protocol):
     def to_json(self, output: Any) -> str: # type: ignore
         pass
 
+    def to_compact(self, output: Any) -> Any:
+        pass
+
+    def from_compact(self, data: Any) -> Any:
+        pass
+
 
 class DefaultHandler:
     def output_on_image(self, image, output):
@@ -30,40 +34,61 @@ class DefaultHandler:
     def to_json(self, output: Any) -> str:
         return json.dumps(output)
 
+    def to_compact(self, output: Any) -> Any:
+        from octopipes.encoding import encode
+        return encode(output)
+
+    def from_compact(self, data: Any) -> Any:
+        from octopipes.encoding import decode
+        return decode(data)
+
 
 class SegmentationMasksHandler:
+    """SegmentationMasksHandler handles masks annotations of the form [{'segmentation': mask, 'area': area, ...}, ...]
+    or arrays of masks"""
+
     def output_on_image(self, image, output):
         import numpy as np
-        import cv2
+        from octopipes.rendering import draw_masks
 
-        sorted_anns = sorted(output, key=(lambda x: x['area']), reverse=True)
-        w, h = sorted_anns[0]['segmentation'].shape[0], sorted_anns[0]['segmentation'].shape[1]
-        overlay_mask = np.zeros((w, h, 3), dtype=np.uint8)
-        for ann in sorted_anns:
-            mask = ann['segmentation']
-            overlay_mask[mask] = np.random.randint(256, size=3, dtype=np.uint8)
-        overlayed = cv2.addWeighted(image, 1, overlay_mask, 0.3, 20)
-        return overlayed
+        if isinstance(output, np.ndarray):
+            masks = list(output)
+        else:
+            # larger masks are drawn first so that smaller ones stay visible
+            order = np.argsort([-ann['area'] for ann in output], kind='stable')
+            masks = [output[i]['segmentation'] for i in order]
+        return draw_masks(image, masks)
 
     def to_json(self, output) -> str:
         return json.dumps({'segmentation': output.tolist(), 'len_output': self.len_output(output)})
 
+    def to_compact(self, output) -> dict:
+        from octopipes.encoding import encode
+        # masks are run-length encoded
+        return {'segmentation': encode(output), 'len_output': self.len_output(output)}
+
+    def from_compact(self, data: dict) -> Any:
+        from octopipes.encoding import decode
+        return decode(data['segmentation'])
+
     def len_output(self, output: Any) -> int | None:
         return len(output) if output is not None else 0
 
 
 class BboxesHandler:
+    def __init__(self, color: tuple[int, int, int] | None = None) -> None:
+        """Constructor of BboxesHandler
+
+        :param tuple | None color: color of the bboxes, a deterministic color is used if None.
+        """
+        self.color = color
+
     def output_on_image(self, image, output):
-        import cv2
-        import numpy as np
+        from octopipes.rendering import draw_bboxes, palette
 
         if output is None:
             return image
-        color = np.random.choice(range(256), size=3).tolist()
-        for bbox in output:
-            cv2.rectangle(image, (bbox[0], bbox[1]), (bbox[2], bbox[3]), color, 3)
-
-        return image
+        return draw_bboxes(image, output, self.color if self.color is not None else palette(1)[0])
 
     def to_json(self, output) -> str:
         try:
@@ -74,6 +99,15 @@ class BboxesHandler:
         return json.dumps({'bboxes': [{'bbox': bbox} for bbox in output] if output is not None else None,
                            'len_output': self.len_output(output)})
 
+    def to_compact(self, output) -> dict:
+        from octopipes.encoding import encode_array
+        return {'bboxes': encode_array(output) if output is not None else None,
+                'len_output': self.len_output(output)}
+
+    def from_compact(self, data: dict) -> Any:
+        from octopipes.encoding import decode
+        return decode(data['bboxes'])
+
     def len_output(self, output: Any) -> int | None:
         if output is not None and hasattr(output, '__len__'):
             return len(output)
@@ -86,19 +120,16 @@ class CmapBboxesHandler:
 
     def output_on_image(self, image, output):
         import cv2
-        import numpy as np
+        from octopipes.rendering import colormap_colors
 
         values, bboxes = zip(*output)
-        values = np.array(values)
-        norm_values = (values - values.min()) / (values.max() - values.min())
-        cm = cmap.Colormap('viridis')(norm_values)
+        colors = colormap_colors(values).tolist()
 
-        for i, bbox in enumerate(bboxes):
-            color = np.array(255 * cm[i, :3], dtype=int)
+        for bbox, color in zip(bboxes, colors):
             cv2.rectangle(image,
-                          (bbox[0], bbox[1]), (bbox[2], bbox[3]),
-                          (color[0], color[1], color[2]), 3)
-        
+                          (int(bbox[0]), int(bbox[1])), (int(bbox[2]), int(bbox[3])),
+                          color, 3)
+
         return image
 
     def to_json(self, output) -> str:
@@ -110,6 +141,19 @@ class CmapBboxesHandler:
         return json.dumps({'bboxes': [{'bbox': bbox, 'val': val} for bbox, val in output] if output is not None else None,
                            'len_output': self.len_output(output)})
 
+    def to_compact(self, output) -> dict:
+        from octopipes.encoding import encode_array
+        if output is None:
+            return {'bboxes': None, 'values': None, 'len_output': 0}
+        bboxes, values = zip(*output) if len(output) else ((), ())
+        return {'bboxes': encode_array(bboxes), 'values': encode_array(values), 'len_output': self.len_output(output)}
+
+    def from_compact(self, data: dict) -> Any:
+        from octopipes.encoding import decode
+        if data['bboxes'] is None:
+            return None
+        return list(zip(decode(data['bboxes']), decode(data['values'])))
+
     def len_output(self, output: Any) -> int | None:
         if output is not None and hasattr(output, '__len__'):
             return len(output)
@@ -122,13 +166,14 @@ class CirclesHandler:
     def output_on_image(self, image, output):
         import cv2
         import numpy as np
+        from octopipes.rendering import palette
 
         if output is None:
             return image
 
-        for x, y, r in output:
-            color = tuple(map(int, np.random.choice(range(256), size=3)))
-            cv2.circle(image, (int(x), int(y)), int(r), color, 3)
+        circles = np.asarray(output).reshape(-1, 3).astype(int).tolist()
+        for (x, y, r), color in zip(circles, palette(len(circles)).tolist()):
+            cv2.circle(image, (x, y), r, color, 3)
         return image
 
     def to_json(self, output) -> str:
@@ -139,6 +184,15 @@ class CirclesHandler:
             pass
         return json.dumps({'circles': output, 'len_output': self.len_output(output)})
 
+    def to_compact(self, output) -> dict:
+        from octopipes.encoding import encode_array
+        return {'circles': encode_array(output) if output is not None else None,
+                'len_output': self.len_output(output)}
+
+    def from_compact(self, data: dict) -> Any:
+        from octopipes.encoding import decode
+        return decode(data['circles'])
+
     def len_output(self, output: Any) -> int | None:
         if output is not None and hasattr(output, '__len__'):
             return len(output)
@@ -0,0 +1,107 @@
+"""Step hooks measuring the resources used by every step (see `Workflow.add_step_hook`).
+Their fields are added to `Results.output_recap`, telling compute-bound steps from allocation-heavy ones."""
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+
+class CpuTime:
+    """Records the CPU time of the process during the step (`cpu_time`, in seconds). It includes the threads started
+    by native libraries, and the other steps running at the same time with `run_parallel`."""
+
+    def before_step(self, run, step: int) -> float:
+        return time.process_time()
+
+    def after_step(self, run, step: int, output: Any, start: float) -> dict[str, Any]:
+        return {'cpu_time': time.process_time() - start}
+
+
+class PeakMemory:
+    """Records the peak of the memory allocated by python and numpy during the step over the memory allocated
+    before it (`peak_memory`, in bytes). tracemalloc is started if needed, which slows the allocations down.
+    The peak is shared by the steps running at the same time."""
+
+    def before_step(self, run, step: int) -> int:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        return current
+
+    def after_step(self, run, step: int, output: Any, start: int) -> dict[str, Any]:
+        _, peak = tracemalloc.get_traced_memory()
+        return {'peak_memory': max(peak - start, 0)}
+
+
+def rss() -> int | None:
+    """Returns the resident set size of the process in bytes, None if it is not available"""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class RssDelta:
+    """Records the change of the resident set size of the process during the step (`rss_delta`, in bytes).
+    It includes the memory of native libraries (e.g. GPU runtimes) that tracemalloc does not see."""
+
+    def before_step(self, run, step: int) -> int | None:
+        return rss()
+
+    def after_step(self, run, step: int, output: Any, start: int | None) -> dict[str, Any] | None:
+        end = rss()
+        if start is None or end is None:
+            return None
+        return {'rss_delta': end - start}
+
+
+def nbytes(value: Any) -> int:
+    """Returns the size of a value in bytes: the buffer of arrays and tensors, the sum of the items of containers
+    and the size of the python object otherwise"""
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'element_size') and hasattr(value, 'nelement'):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(nbytes(key) + nbytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class OutputBytes:
+    """Records the size of the output of the step (`output_bytes`)"""
+
+    def before_step(self, run, step: int) -> None:
+        return None
+
+    def after_step(self, run, step: int, output: Any, token: None) -> dict[str, Any]:
+        return {'output_bytes': nbytes(output)}
+
+
+def instrument(workflow, cpu_time: bool = True, peak_memory: bool = False, rss_delta: bool = True,
+               output_bytes: bool = True):
+    """Adds the instrumentation hooks to a workflow and returns it.
+
+    :param Workflow workflow: workflow to instrument.
+    :param bool cpu_time: records the CPU time of the steps.
+    :param bool peak_memory: records the peak memory allocated by the steps with tracemalloc, unset by default
+                             as tracing slows the allocations down.
+    :param bool rss_delta: records the change of the resident set size during the steps.
+    :param bool output_bytes: records the size of the outputs of the steps.
+    """
+    for enabled, hook in [(cpu_time, CpuTime), (peak_memory, PeakMemory), (rss_delta, RssDelta),
+                          (output_bytes, OutputBytes)]:
+        if enabled:
+            workflow.add_step_hook(hook())
+    return workflow
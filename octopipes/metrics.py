@@ -0,0 +1,203 @@
+"""Ground truth evaluation of the outputs of the handlers: IoU matrices of bboxes, circles and masks, and
+detection metrics (precision, recall, AP/mAP) accumulated incrementally over the samples"""
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from octopipes.handlers import BboxesHandler, CirclesHandler, SegmentationMasksHandler
+
+
+def box_iou(boxes, others) -> np.ndarray:
+    """Returns the (N, M) IoU matrix of (N, 4) and (M, 4) boxes (x, y, maxx, maxy)"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    others = np.asarray(others, dtype=np.float64).reshape(-1, 4)
+    top_left = np.maximum(boxes[:, None, :2], others[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], others[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area = np.prod(boxes[:, 2:] - boxes[:, :2], axis=1)
+    other_area = np.prod(others[:, 2:] - others[:, :2], axis=1)
+    union = area[:, None] + other_area[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def circle_iou(circles, others) -> np.ndarray:
+    """Returns the (N, M) IoU matrix of (N, 3) and (M, 3) circles (x, y, radius)"""
+    circles = np.asarray(circles, dtype=np.float64).reshape(-1, 3)
+    others = np.asarray(others, dtype=np.float64).reshape(-1, 3)
+    r = circles[:, None, 2]
+    s = others[None, :, 2]
+    d = np.hypot(circles[:, None, 0] - others[None, :, 0], circles[:, None, 1] - others[None, :, 1])
+
+    # area of the lens of two intersecting circles, the arguments are clipped where the circles do not intersect
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = np.arccos(np.clip((d ** 2 + r ** 2 - s ** 2) / (2 * d * r), -1, 1))
+        beta = np.arccos(np.clip((d ** 2 + s ** 2 - r ** 2) / (2 * d * s), -1, 1))
+        lens = (r ** 2 * (alpha - np.sin(2 * alpha) / 2) + s ** 2 * (beta - np.sin(2 * beta) / 2))
+    contained = d <= np.abs(r - s)
+    intersection = np.where(d >= r + s, 0., np.where(contained, np.pi * np.minimum(r, s) ** 2, lens))
+    union = np.pi * (r ** 2 + s ** 2) - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def mask_iou(masks, others) -> np.ndarray:
+    """Returns the (N, M) IoU matrix of (N, H, W) and (M, H, W) boolean masks"""
+    masks = np.asarray(masks, dtype=bool)
+    others = np.asarray(others, dtype=bool)
+    if not masks.size or not others.size:
+        return np.zeros((len(masks), len(others)))
+    masks = masks.reshape(len(masks), -1)
+    others = others.reshape(len(others), -1)
+    # intersections of all the pairs as a single matrix product
+    intersection = masks.astype(np.float32) @ others.astype(np.float32).T
+    union = masks.sum(1)[:, None] + others.sum(1)[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0).astype(np.float64)
+
+
+def match(iou: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """Greedily matches predictions sorted by decreasing score to the ground truths (COCO style).
+    Returns the (T, N) true positive flags of the N predictions at every IoU threshold."""
+    nthresholds, (npredictions, ntruths) = len(thresholds), iou.shape
+    true_positives = np.zeros((nthresholds, npredictions), dtype=bool)
+    if not npredictions or not ntruths:
+        return true_positives
+    matched = np.zeros((nthresholds, ntruths), dtype=bool)
+    for prediction in range(npredictions):
+        # the best unmatched ground truth of the prediction at every threshold at once
+        candidates = np.where(matched, -1., iou[prediction][None, :])
+        best = candidates.argmax(axis=1)
+        hits = candidates[np.arange(nthresholds), best] >= thresholds
+        true_positives[hits, prediction] = True
+        matched[np.flatnonzero(hits), best[hits]] = True
+    return true_positives
+
+
+def average_precision(scores: np.ndarray, true_positives: np.ndarray, npositives: int) -> np.ndarray:
+    """Returns the 101-point interpolated average precision at every threshold of (T, N) true positive flags"""
+    if npositives == 0:
+        return np.full(len(true_positives), np.nan)
+    order = np.argsort(-scores, kind='stable')
+    tp = np.cumsum(true_positives[:, order], axis=1)
+    fp = np.cumsum(~true_positives[:, order], axis=1)
+    recall = tp / npositives
+    precision = tp / np.maximum(tp + fp, 1)
+    # precision envelope: the best precision at any higher recall
+    envelope = np.flip(np.maximum.accumulate(np.flip(precision, axis=1), axis=1), axis=1)
+    points = np.linspace(0, 1, 101)
+    aps = []
+    for recalls, precisions in zip(recall, envelope):
+        indices = np.searchsorted(recalls, points, side='left')
+        sampled = np.where(indices < len(precisions), precisions[np.minimum(indices, len(precisions) - 1)], 0.)
+        aps.append(sampled.mean() if len(precisions) else 0.)
+    return np.array(aps)
+
+
+def _bboxes(output) -> tuple[np.ndarray, np.ndarray | None]:
+    return _split(output, 4)
+
+
+def _circles(output) -> tuple[np.ndarray, np.ndarray | None]:
+    return _split(output, 3)
+
+
+def _split(output, size: int) -> tuple[np.ndarray, np.ndarray | None]:
+    # shapes with an extra column carry their score
+    array = np.asarray(output if output is not None else [], dtype=np.float64)
+    array = array.reshape(-1, array.shape[-1] if array.ndim > 1 else size)
+    if array.shape[1] > size:
+        return array[:, :size], array[:, size]
+    return array, None
+
+
+def _masks(output) -> tuple[np.ndarray, np.ndarray | None]:
+    if output is None:
+        return np.zeros((0, 0, 0), dtype=bool), None
+    if isinstance(output, np.ndarray):
+        return output.astype(bool, copy=False), None
+    if len(output) and isinstance(output[0], dict):
+        masks = np.asarray([annotation['segmentation'] for annotation in output], dtype=bool)
+        scores = [annotation.get('score', annotation.get('predicted_iou')) for annotation in output]
+        return masks, None if None in scores else np.asarray(scores, dtype=np.float64)
+    return np.asarray(output, dtype=bool), None
+
+
+KINDS: dict[str, tuple[Callable, Callable]] = {
+    'bbox': (box_iou, _bboxes),
+    'circle': (circle_iou, _circles),
+    'mask': (mask_iou, _masks),
+}
+
+
+class DetectionMetrics:
+    """DetectionMetrics accumulates the matches of predicted shapes (bboxes, circles or masks) to the ground truth
+    of every sample, and computes the precision, the recall and the AP over all the samples seen so far.
+
+    Predictions may carry their score as an extra column (bboxes and circles) or a 'score' key (mask annotations),
+    otherwise the order of the predictions is used as their ranking."""
+
+    def __init__(self, kind: str = 'bbox', thresholds=np.linspace(0.5, 0.95, 10)) -> None:
+        """Constructor of DetectionMetrics
+
+        :param str kind: 'bbox', 'circle' or 'mask'.
+        :param thresholds: IoU thresholds of the matches, the AP is averaged over them (mAP).
+        """
+        if kind not in KINDS:
+            raise ValueError(f'unknown kind {kind!r}, expected one of {list(KINDS)}')
+        self.kind = kind
+        self.iou, self.parse = KINDS[kind]
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.samples = 0
+        self.npositives = 0
+        self._scores: list[np.ndarray] = []
+        self._true_positives: list[np.ndarray] = []
+        self._ious: list[np.ndarray] = []
+
+    def update(self, output, ground_truth):
+        """Matches the predictions of a sample to its ground truth"""
+        predictions, scores = self.parse(output)
+        truths, _ = self.parse(ground_truth)
+        if scores is None:
+            # decreasing scores keep the order of the predictions
+            scores = -np.arange(len(predictions), dtype=np.float64)
+        iou = self.iou(predictions, truths)
+        order = np.argsort(-scores, kind='stable')
+        self._true_positives.append(match(iou[order], self.thresholds)[:, np.argsort(order)])
+        self._scores.append(scores)
+        if iou.size:
+            self._ious.append(iou.max(axis=1))
+        self.npositives += len(truths)
+        self.samples += 1
+
+    def merge(self, other: 'DetectionMetrics'):
+        self.samples += other.samples
+        self.npositives += other.npositives
+        self._scores += other._scores
+        self._true_positives += other._true_positives
+        self._ious += other._ious
+        return self
+
+    def compute(self) -> dict[str, Any]:
+        """Returns the precision and recall at the first threshold, the AP at every threshold,
+        the mAP over the thresholds and the mean IoU of the predictions with their best ground truth"""
+        scores = np.concatenate(self._scores) if self._scores else np.zeros(0)
+        true_positives = (np.concatenate(self._true_positives, axis=1) if self._true_positives
+                          else np.zeros((len(self.thresholds), 0), dtype=bool))
+        npredictions = len(scores)
+        tp = true_positives.sum(axis=1)
+        aps = average_precision(scores, true_positives, self.npositives)
+        return {'samples': self.samples,
+                'predictions': npredictions,
+                'ground_truths': self.npositives,
+                'precision': float(tp[0] / npredictions) if npredictions else float('nan'),
+                'recall': float(tp[0] / self.npositives) if self.npositives else float('nan'),
+                'ap': {round(float(t), 2): float(ap) for t, ap in zip(self.thresholds, aps)},
+                'map': float(np.nanmean(aps)) if self.npositives else float('nan'),
+                'mean_iou': float(np.concatenate(self._ious).mean()) if self._ious else float('nan')}
+
+
+def metrics_for(handler) -> DetectionMetrics | None:
+    """Returns the metrics matching the outputs of a handler, None if the handler has no metrics"""
+    for handler_type, kind in [(BboxesHandler, 'bbox'), (CirclesHandler, 'circle'), (SegmentationMasksHandler, 'mask')]:
+        if isinstance(handler, handler_type):
+            return DetectionMetrics(kind)
+    return None
@@ -0,0 +1,194 @@
+"""Centralized progress reporting of a benchmark: the workers send rate-limited counter updates over a queue
+and the parent shows a single aggregated bar"""
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from tqdm import tqdm
+
+
+class ProgressReporter:
+    """ProgressReporter counts the samples started and done and the steps run in a worker.
+    The counts are sent to the queue of the `ProgressMonitor` at most every `interval` seconds."""
+
+    def __init__(self, channel: Any, interval: float = 0.5) -> None:
+        """Constructor of ProgressReporter
+
+        :param channel: queue the updates are put in.
+        :param float interval: minimum time between two updates, in seconds.
+        """
+        self.channel = channel
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._started = 0
+        self._done = 0
+        self._steps = 0
+        self._last = time.monotonic()
+        self._finalizer = None
+
+    def __getstate__(self):
+        return {'channel': self.channel, 'interval': self.interval}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _register(self):
+        if self._pid != os.getpid():
+            # counters do not survive a fork, the child process reports its own
+            self._reset()
+        if self._finalizer is None:
+            try:
+                from multiprocess.util import Finalize
+                # the last counts of a worker are sent when it exits
+                self._finalizer = Finalize(self, self.flush, exitpriority=10)
+            except ImportError:
+                self._finalizer = False
+
+    def sample_started(self):
+        self._register()
+        with self._lock:
+            self._started += 1
+        self._maybe_flush()
+
+    def sample_done(self):
+        with self._lock:
+            self._done += 1
+        self._maybe_flush()
+
+    def add_steps(self, count: int):
+        with self._lock:
+            self._steps += count
+        self._maybe_flush()
+
+    def track_steps(self, steps: Iterable) -> Iterator:
+        """Iterates over the steps of a workflow run, counting them"""
+        for step in steps:
+            with self._lock:
+                self._steps += 1
+            yield step
+        self._maybe_flush()
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            update = (self._started, self._done, self._steps)
+            self._started = self._done = self._steps = 0
+            self._last = time.monotonic()
+        if any(update):
+            self.channel.put(update)
+
+
+class ProgressMonitor:
+    """ProgressMonitor aggregates the updates of the reporters in a background thread and shows a single bar
+    of the samples collected, with the rates of samples and steps and the number of samples in flight."""
+
+    def __init__(self, total: int | None = None, shared_memory: bool = True, interval: float = 0.5,
+                 display: bool = True) -> None:
+        """Constructor of ProgressMonitor
+
+        :param int | None total: expected number of samples.
+        :param bool shared_memory: whether the reporters run in this process (threads), or in other processes.
+        :param float interval: minimum time between two updates of a reporter, in seconds.
+        :param bool display: whether to show the bar.
+        """
+        if shared_memory:
+            self.channel = queue.Queue()
+        else:
+            import multiprocess
+
+            self.channel = multiprocess.Queue()
+        self.interval = interval
+        self.total = total
+        self.display = display
+        self.samples = 0
+        self.started = 0
+        self.done = 0
+        self.steps = 0
+        self._start = time.perf_counter()
+        self._bar: tqdm | None = None
+        self._thread: threading.Thread | None = None
+        self._local_reporters: list[ProgressReporter] = []
+        self._shared_memory = shared_memory
+
+    def reporter(self) -> ProgressReporter:
+        reporter = ProgressReporter(self.channel, self.interval)
+        if self._shared_memory:
+            self._local_reporters.append(reporter)
+        return reporter
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.display:
+            self._bar = tqdm(total=self.total, desc='samples', unit='sample')
+        self._thread = threading.Thread(target=self._drain, name='octopipes-progress', daemon=True)
+        self._thread.start()
+        return self
+
+    def _drain(self):
+        while self._receive(timeout=None):
+            pass
+
+    def _receive(self, timeout: float | None):
+        try:
+            update = self.channel.get(timeout=timeout)
+        except (queue.Empty, EOFError, OSError):
+            return False
+        if update is None:
+            return False
+        started, done, steps = update
+        self.started += started
+        self.done += done
+        self.steps += steps
+        self._refresh()
+        return True
+
+    def collected(self, count: int = 1):
+        """Records samples collected by the parent"""
+        self.samples += count
+        if self._bar is not None:
+            self._bar.update(count)
+            self._refresh()
+
+    def _refresh(self):
+        if self._bar is not None:
+            stats = self.stats()
+            self._bar.set_postfix({'steps/s': f'{stats["steps_per_s"]:.1f}', 'in flight': stats['in_flight']},
+                                  refresh=False)
+
+    def stats(self) -> dict[str, Any]:
+        elapsed = time.perf_counter() - self._start
+        return {'samples': self.samples,
+                'steps': self.steps,
+                'in_flight': max(self.started - self.done, 0),
+                'elapsed': elapsed,
+                'samples_per_s': self.samples / elapsed if elapsed else 0.,
+                'steps_per_s': self.steps / elapsed if elapsed else 0.}
+
+    def stop(self):
+        """Stops the monitor once the workers are done, receiving their last updates"""
+        for reporter in self._local_reporters:
+            reporter.flush()
+        # the updates of a queue are received in order, the sentinel is received after the last ones
+        self.channel.put(None)
+        if self._thread is not None:
+            self._thread.join()
+        if self._bar is not None:
+            self._refresh()
+            self._bar.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,89 @@
+"""Rendering helpers shared by the handlers: cached colormap lookup tables, deterministic palettes,
+label maps of masks and batched drawing"""
+import functools
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+
+@functools.lru_cache(maxsize=16)
+def colormap_lut(name: str = 'viridis', size: int = 256) -> np.ndarray:
+    """Returns the (size, 3) uint8 lookup table of a colormap"""
+    import cmap
+
+    lut = np.array(255 * cmap.Colormap(name)(np.linspace(0, 1, size))[:, :3], dtype=np.uint8)
+    lut.setflags(write=False)
+    return lut
+
+
+def colormap_colors(values, name: str = 'viridis') -> np.ndarray:
+    """Maps values normalized between their min and max to the colors of a colormap"""
+    values = np.asarray(values, dtype=float)
+    lut = colormap_lut(name)
+    span = values.max() - values.min() if values.size else 0
+    norm = (values - values.min()) / span if span else np.zeros_like(values)
+    return lut[np.rint(norm * (len(lut) - 1)).astype(int)]
+
+
+@functools.lru_cache(maxsize=16)
+def _palette(size: int, seed: int) -> np.ndarray:
+    colors = np.random.default_rng(seed).integers(0, 256, size=(size, 3), dtype=np.uint8)
+    colors.setflags(write=False)
+    return colors
+
+
+def palette(n: int, seed: int = 0) -> np.ndarray:
+    """Returns n deterministic colors as a (n, 3) uint8 array. The first colors do not depend on n."""
+    size = 256
+    while size < n:
+        size *= 2
+    return _palette(size, seed)[:n]
+
+
+def label_map(masks: Sequence[Any], shape: tuple[int, int] | None = None) -> np.ndarray:
+    """Builds the label map of boolean masks: every pixel holds the index of the last mask covering it, -1 if none"""
+    if shape is None:
+        shape = np.shape(masks[0])[:2]
+    dtype = np.int16 if len(masks) < np.iinfo(np.int16).max else np.int32
+    if not len(masks):
+        return np.full(shape, -1, dtype=dtype)
+    stacked = np.asarray(masks, dtype=bool).reshape(len(masks), *shape)
+    # the first covering mask of the reversed stack is the last one covering the pixel
+    labels = (len(masks) - 1 - stacked[::-1].argmax(axis=0)).astype(dtype, copy=False)
+    labels[~stacked.any(axis=0)] = -1
+    return labels
+
+
+def draw_masks(image, masks: Sequence[Any], colors: np.ndarray | None = None, alpha: float = 0.3, gamma: float = 20):
+    """Overlays masks on an image, later masks are drawn over the previous ones"""
+    import cv2
+
+    labels = label_map(masks, shape=image.shape[:2])
+    colors = palette(len(masks)) if colors is None else np.asarray(colors, dtype=np.uint8)
+    # index -1 (no mask) maps to the extra black color
+    lut = np.concatenate((colors, np.zeros((1, 3), dtype=np.uint8)))
+    overlay_mask = lut[labels]
+    return cv2.addWeighted(image, 1, overlay_mask, alpha, gamma)
+
+
+def draw_bboxes(image, bboxes, color, thickness: int = 3):
+    """Draws bboxes (x, y, maxx, maxy) of the same color in a single call"""
+    import cv2
+
+    bboxes = np.asarray(bboxes).reshape(-1, 4).astype(np.int32)
+    if len(bboxes):
+        x, y, maxx, maxy = bboxes.T
+        corners = np.stack([np.stack([x, y], 1), np.stack([maxx, y], 1),
+                            np.stack([maxx, maxy], 1), np.stack([x, maxy], 1)], axis=1)
+        cv2.polylines(image, list(corners), True, tuple(int(c) for c in color), thickness)
+    return image
+
+
+def render_batch(handler, images: Sequence[Any], outputs: Sequence[Any], copy: bool = True) -> list:
+    """Draws the outputs of a handler on a batch of images. A stacked (N, H, W, 3) array of images is copied at once,
+    the outputs are still drawn one image at a time as the handlers draw with cv2 on a single image."""
+    if copy and isinstance(images, np.ndarray):
+        images, copy = images.copy(), False
+    return [handler.output_on_image(image.copy() if copy else image, output)
+            for image, output in zip(images, outputs)]
@@ -1,12 +1,21 @@
 from typing import Any
-from typing_extensions import TypedDict
+from typing_extensions import NotRequired, TypedDict
 
 from pydantic import BaseModel, ConfigDict
 
 
 class Step(TypedDict):
+    # fields returned by custom step hooks are kept as well
+    __pydantic_config__ = ConfigDict(extra='allow')  # type: ignore
+
     step: str
     duration: float
+    cached: NotRequired[bool]
+    # fields of the instrumentation hooks (see `octopipes.hooks.instrumentation`)
+    cpu_time: NotRequired[float]
+    peak_memory: NotRequired[int]
+    rss_delta: NotRequired[int]
+    output_bytes: NotRequired[int]
 
 
 class Results(BaseModel):
@@ -22,3 +31,78 @@ class Results(BaseModel):
     total_duration: float
     output_recap: tuple[Step, ...]
     json_output: str
+    compact_output: Any = None
+
+
+class LazyResults:
+    """Lightweight frozen run of a workflow. The handler based fields (`json_output`, `len_output`, `compact_output`)
+    and the steps recap are only computed when accessed. `to_results` returns the validated `Results`."""
+
+    __slots__ = ('name', 'metadata_name', 'metadata', 'nsteps', 'current_step', 'output', 'total_duration',
+                 'handler', 'steps', 'durations', 'cache_hits', 'metrics', '_json_output', '_len_output', '_compact_output')
+
+    def __init__(self, name: str, metadata_name: str, metadata: dict, nsteps: int, current_step: int,
+                 output: Any, handler: Any, steps: tuple[str, ...], durations: tuple[float, ...],
+                 cache_hits: tuple[bool | None, ...] = (), metrics: tuple[dict[str, Any] | None, ...] = ()) -> None:
+        self.name = name
+        self.metadata_name = metadata_name
+        self.metadata = metadata
+        self.nsteps = nsteps
+        self.current_step = current_step
+        self.output = output
+        self.total_duration = sum(durations)
+        self.handler = handler
+        self.steps = steps
+        self.durations = durations
+        self.cache_hits = cache_hits
+        self.metrics = metrics
+        # Ellipsis marks the fields that are not computed yet (None is a valid len_output).
+        self._json_output = ...
+        self._len_output = ...
+        self._compact_output = ...
+
+    @property
+    def json_output(self) -> str:
+        if self._json_output is ...:
+            self._json_output = self.handler.to_json(self.output)
+        return self._json_output
+
+    @property
+    def len_output(self) -> int | None:
+        if self._len_output is ...:
+            self._len_output = self.handler.len_output(self.output)
+        return self._len_output
+
+    @property
+    def compact_output(self) -> Any:
+        if self._compact_output is ...:
+            self._compact_output = self.handler.to_compact(self.output)
+        return self._compact_output
+
+    @property
+    def output_recap(self) -> tuple[Step, ...]:
+        recap = []
+        for name, duration, cached, metrics in zip(self.steps, self.durations,
+                                                   self.cache_hits or (None,) * len(self.steps),
+                                                   self.metrics or (None,) * len(self.steps)):
+            step: Step = {'step': name, 'duration': duration}
+            if cached is not None:
+                step['cached'] = cached
+            if metrics:
+                step.update(metrics)  # type: ignore
+            recap.append(step)
+        return tuple(recap)
+
+    def to_results(self) -> Results:
+        return Results(name=self.name,
+                       metadata_name=self.metadata_name,
+                       metadata=self.metadata,
+                       nsteps=self.nsteps,
+                       current_step=self.current_step,
+                       output=self.output,
+                       len_output=self.len_output,
+                       total_duration=self.total_duration,
+                       output_recap=self.output_recap,
+                       json_output=self.json_output,
+                       # the compact output is only set once computed, None is a valid encoding
+                       **({} if self._compact_output is ... else {'compact_output': self._compact_output}))
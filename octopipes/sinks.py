@@ -0,0 +1,152 @@
+"""Sinks streaming the results of a benchmark to disk as soon as they are available"""
+import json
+import pathlib
+from collections.abc import Iterator
+from typing import Any, Protocol
+
+from octopipes.aggregate_flows import AggregateFlows
+from octopipes.results import LazyResults, Results
+
+
+class ResultsSink(Protocol):
+    def write(self, index: int, aggregate: AggregateFlows) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+_RECORD_FIELDS = ('name', 'metadata_name', 'metadata', 'nsteps', 'current_step', 'len_output', 'total_duration')
+
+
+def to_record(index: int, result: Results | LazyResults, compact: bool = False) -> dict[str, Any]:
+    """Returns the serializable fields of a result. The raw `output` is dropped, `json_output` is kept instead
+    or, if `compact` is set, the compact encoding of the output (see `HandlerInterface.to_compact`)."""
+    record = {field: getattr(result, field) for field in _RECORD_FIELDS}
+    record['sample'] = index
+    record['output_recap'] = [dict(step) for step in result.output_recap]
+    if compact:
+        # None is a valid compact encoding (e.g. of a None output), eager results tell whether it was computed
+        if not isinstance(result, LazyResults) and 'compact_output' not in result.model_fields_set:
+            raise ValueError(f'result of {result.name!r} has no compact output, freeze it with lazy=True or compact=True')
+        record['json_output'] = ''
+        record['compact_output'] = result.compact_output
+    else:
+        record['json_output'] = result.json_output
+    return record
+
+
+def from_record(record: dict[str, Any]) -> tuple[int, Results]:
+    record = dict(record)
+    index = record.pop('sample')
+    return index, Results(output=None, **record)
+
+
+class JsonlResultsSink:
+    """Writes every result as a line of a JSONL file.
+    If `compact` is set, the compact encoding of the outputs is stored instead of their json output."""
+
+    def __init__(self, path: str | pathlib.Path, compact: bool = False) -> None:
+        self.path = pathlib.Path(path)
+        self.compact = compact
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w')
+
+    def write(self, index: int, aggregate: AggregateFlows) -> None:
+        for result in aggregate.results:
+            self._file.write(json.dumps(to_record(index, result, compact=self.compact), default=str))
+            self._file.write('\n')
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetResultsSink:
+    """Writes the results to a columnar parquet file, `row_group_size` results at a time.
+    If `compact` is set, the compact encoding of the outputs is stored instead of their json output.
+    The fields of the steps are the ones of `Step`, other fields added by custom step hooks are dropped.
+    Requires `pyarrow` to be installed."""
+
+    def __init__(self, path: str | pathlib.Path, row_group_size: int = 1024, compact: bool = False) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.path = pathlib.Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.row_group_size = row_group_size
+        self.compact = compact
+        self.schema = pa.schema([
+            ('sample', pa.int64()),
+            ('name', pa.string()),
+            ('metadata_name', pa.string()),
+            ('metadata', pa.string()),
+            ('nsteps', pa.int64()),
+            ('current_step', pa.int64()),
+            ('len_output', pa.int64()),
+            ('total_duration', pa.float64()),
+            ('output_recap', pa.list_(pa.struct([('step', pa.string()), ('duration', pa.float64()),
+                                                 ('cached', pa.bool_()), ('cpu_time', pa.float64()),
+                                                 ('peak_memory', pa.int64()), ('rss_delta', pa.int64()),
+                                                 ('output_bytes', pa.int64())]))),
+            ('json_output', pa.string()),
+            ('compact_output', pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._rows: list[dict[str, Any]] = []
+
+    def write(self, index: int, aggregate: AggregateFlows) -> None:
+        for result in aggregate.results:
+            record = to_record(index, result, compact=self.compact)
+            record['metadata'] = json.dumps(record['metadata'], default=str)
+            if self.compact:
+                record['compact_output'] = json.dumps(record['compact_output'])
+            self._rows.append(record)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self) -> None:
+        import pyarrow as pa
+
+        if self._rows:
+            self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+            self._rows = []
+
+    def close(self) -> None:
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_results(path: str | pathlib.Path, batch_size: int = 1024) -> Iterator[tuple[int, Results]]:
+    """Lazily iterates over the `(sample index, Results)` pairs written by a sink.
+    The `output` of the results is None as only `json_output` (or `compact_output`) is stored,
+    the handler's `from_compact` or `octopipes.encoding.decode` decode the compact output."""
+    path = pathlib.Path(path)
+    if path.suffix == '.parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            for record in batch.to_pylist():
+                record['metadata'] = json.loads(record['metadata'])
+                if record['compact_output'] is not None:
+                    record['compact_output'] = json.loads(record['compact_output'])
+                # optional fields of the steps are null when missing.
+                record['output_recap'] = [{key: value for key, value in step.items() if value is not None}
+                                          for step in record['output_recap']]
+                yield from_record(record)
+    else:
+        with open(path) as file:
+            for line in file:
+                if line.strip():
+                    yield from_record(json.loads(line))
@@ -0,0 +1,233 @@
+"""Streaming latency statistics of workflow runs: quantile sketches, histograms and throughput per workflow and step.
+The statistics use a constant memory whatever the number of runs and can be merged across processes."""
+import bisect
+import math
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a relative accuracy guarantee (DDSketch): the quantiles it returns are within
+    `relative_accuracy` of the exact ones. Values are counted in logarithmic buckets, at most `max_buckets` of them
+    are kept by collapsing the lowest ones, which only degrades the accuracy of the lowest quantiles."""
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-9) -> None:
+        """Constructor of QuantileSketch
+
+        :param float relative_accuracy: relative accuracy of the quantiles.
+        :param int max_buckets: maximum number of buckets.
+        :param float min_value: values below it are counted as zeros.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.sum = 0.
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < self.min_value:
+            self.zeros += count
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets + 1]
+        merged = sum(self.buckets.pop(key) for key in excess)
+        self.buckets[excess[-1]] = merged
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.gamma != self.gamma:
+            raise ValueError('sketches of different accuracies cannot be merged')
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Returns the q-quantile (0 <= q <= 1) of the values, nan if there are none"""
+        if not 0 <= q <= 1:
+            raise ValueError(f'quantile {q} is not between 0 and 1')
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return max(self.min, 0.)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # the middle of the bucket (gamma^(key-1), gamma^key] in relative terms
+                value = 2 * self.gamma ** key / (1 + self.gamma)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else math.nan
+
+
+def log_edges(low: float = 1e-6, high: float = 1e3, per_decade: int = 10) -> tuple[float, ...]:
+    """Returns logarithmically spaced bin edges from `low` to `high`"""
+    decades = round(math.log10(high / low))
+    return tuple(low * 10 ** (i / per_decade) for i in range(decades * per_decade + 1))
+
+
+class Histogram:
+    """Histogram of values over fixed bins. The first and last bins count the values outside of the edges."""
+
+    def __init__(self, edges: Iterable[float] | None = None) -> None:
+        self.edges = tuple(edges) if edges is not None else log_edges()
+        self.counts = [0] * (len(self.edges) + 1)
+
+    def add(self, value: float, count: int = 1):
+        self.counts[bisect.bisect_right(self.edges, value)] += count
+
+    def merge(self, other: 'Histogram'):
+        if other.edges != self.edges:
+            raise ValueError('histograms of different edges cannot be merged')
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+
+@dataclass
+class DurationStats:
+    """Statistics of the durations of a step (or of whole runs) of a workflow"""
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    histogram: Histogram = field(default_factory=Histogram)
+    first: float = math.inf
+    last: float = -math.inf
+
+    def add(self, duration: float, now: float):
+        self.sketch.add(duration)
+        self.histogram.add(duration)
+        self.first = min(self.first, now)
+        self.last = max(self.last, now)
+
+    def merge(self, other: 'DurationStats'):
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+        self.first = min(self.first, other.first)
+        self.last = max(self.last, other.last)
+        return self
+
+    @property
+    def count(self) -> int:
+        return self.sketch.count
+
+    @property
+    def throughput(self) -> float:
+        """Number of durations observed per second of wall-clock time between the first and the last one"""
+        elapsed = self.last - self.first
+        return (self.count - 1) / elapsed if elapsed > 0 else math.nan
+
+
+TOTAL = 'total'
+
+
+class LatencyStats:
+    """LatencyStats gathers the durations of the runs of workflows by `metadata_name` and step name,
+    the durations of whole runs being gathered under the step `TOTAL`.
+
+    It can be fed with finished runs (`observe_run`, it is also a post-workflow hook of `AggregateFlows`),
+    with frozen results (`observe_result`) or with `AggregateFlows` (`observe`). Statistics gathered in different
+    processes are merged with `merge`."""
+
+    QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+    def __init__(self, relative_accuracy: float = 0.01, edges: Iterable[float] | None = None) -> None:
+        """Constructor of LatencyStats
+
+        :param float relative_accuracy: relative accuracy of the quantiles.
+        :param edges: edges of the histograms, logarithmically spaced from 1µs to 1000s if None.
+        """
+        self.relative_accuracy = relative_accuracy
+        self.edges = tuple(edges) if edges is not None else log_edges()
+        self.stats: dict[tuple[str, str], DurationStats] = {}
+
+    def _stats(self, workflow: str, step: str) -> DurationStats:
+        key = (workflow, step)
+        if (stats := self.stats.get(key)) is None:
+            stats = self.stats[key] = DurationStats(QuantileSketch(self.relative_accuracy), Histogram(self.edges))
+        return stats
+
+    def add(self, workflow: str, steps: Iterable[str], durations: Iterable[float]):
+        now = time.time()
+        total = 0.
+        for step, duration in zip(steps, durations):
+            self._stats(workflow, step).add(duration, now)
+            total += duration
+        self._stats(workflow, TOTAL).add(total, now)
+
+    def observe_run(self, run):
+        """Gathers the durations of a finished `WorkflowIter`"""
+        workflow = run.workflow
+        self.add(workflow.metadata_name, (process.__name__ for process in workflow.processes), run.durations)
+
+    __call__ = observe_run
+
+    def observe_result(self, result):
+        """Gathers the durations of a `Results` or a `LazyResults`"""
+        if hasattr(result, 'durations'):
+            self.add(result.metadata_name, result.steps, result.durations)
+        else:
+            self.add(result.metadata_name, (step['step'] for step in result.output_recap),
+                     (step['duration'] for step in result.output_recap))
+
+    def observe(self, aggregate):
+        """Gathers the durations of all the results of an `AggregateFlows`"""
+        for result in aggregate.results:
+            self.observe_result(result)
+
+    def merge(self, other: 'LatencyStats'):
+        for key, stats in other.stats.items():
+            self._stats(*key).merge(stats)
+        return self
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Returns a row of statistics for every workflow and step, durations are in seconds"""
+        rows = []
+        for (workflow, step), stats in self.stats.items():
+            row = {'workflow': workflow, 'step': step, 'count': stats.count,
+                   'mean': stats.sketch.mean, 'min': stats.sketch.min, 'max': stats.sketch.max}
+            for q in self.QUANTILES:
+                row[f'p{round(q * 100)}'] = stats.sketch.quantile(q)
+            row['throughput'] = stats.throughput
+            rows.append(row)
+        return rows
+
+    def table(self) -> str:
+        """Returns the summary as a text table, durations are in milliseconds"""
+        rows = self.summary()
+        if not rows:
+            return ''
+        header = ['workflow', 'step', 'count', 'mean', *(f'p{round(q * 100)}' for q in self.QUANTILES), 'max', 'runs/s']
+        lines = [[row['workflow'], row['step'], str(row['count']),
+                  *(f'{row[column] * 1000:.3f}' for column in header[3:-1]),
+                  f'{row["throughput"]:.1f}' if row['step'] == TOTAL else '']
+                 for row in rows]
+        widths = [max(len(line[i]) for line in [header, *lines]) for i in range(len(header))]
+        return '\n'.join('  '.join(cell.ljust(width) if i < 2 else cell.rjust(width)
+                                   for i, (cell, width) in enumerate(zip(line, widths)))
+                         for line in [header, *lines])
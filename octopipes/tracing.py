@@ -0,0 +1,125 @@
+"""Timeline tracing of workflow runs in the Chrome Trace Event format, to be opened with Perfetto (ui.perfetto.dev)
+or chrome://tracing. Spans of the dataloader batches, transport, steps, freeze and post-workflow hooks are recorded
+with their process and thread.
+
+Tracing is off by default and costs a single attribute check per span then. Once enabled, a span is recorded as
+a tuple in a list, the events are only converted to JSON when the trace is saved."""
+import json
+import os
+import threading
+import time
+from typing import Any
+
+
+# (phase, name, category, start, duration, pid, tid, args) with the times in seconds of `time.perf_counter`,
+# which uses a clock shared by the processes of the machine on Linux.
+Event = tuple[str, str, str, float, float, int, int, dict[str, Any] | None]
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+
+    def __init__(self, tracer: 'Tracer', name: str, category: str, args: dict[str, Any] | None) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.complete(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """Tracer records the events of the current process. Events recorded in other processes are added with `extend`."""
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events: list[Event] = []
+        self._pid = os.getpid()
+        # native id of the current thread, cached as getting it is a system call
+        self._local = threading.local()
+
+    def enable(self, process_name: str | None = None):
+        """Starts recording the events, naming the process in the trace if `process_name` is given"""
+        self._forked()
+        self.enabled = True
+        if process_name is not None:
+            self.events.append(('M', 'process_name', '', 0., 0., self._pid, 0, {'name': process_name}))
+        return self
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Forgets the events recorded so far, e.g. the ones of the parent in a forked worker"""
+        self.events = []
+        self._local = threading.local()
+        self._pid = os.getpid()
+
+    def _forked(self):
+        if self._pid != os.getpid():
+            self.reset()
+
+    def span(self, name: str, category: str, args: dict[str, Any] | None = None) -> Span | _NullSpan:
+        """Returns a context manager recording its duration as an event"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, category, args)
+
+    def complete(self, name: str, category: str, start: float, end: float, args: dict[str, Any] | None = None):
+        """Records an event measured with `time.perf_counter`"""
+        try:
+            tid = self._local.tid
+        except AttributeError:
+            tid = self._local.tid = threading.get_native_id()
+            self.events.append(('M', 'thread_name', '', 0., 0., self._pid, tid,
+                                {'name': threading.current_thread().name}))
+        self.events.append(('X', name, category, start, end - start, self._pid, tid, args))
+
+    def drain(self) -> list[Event]:
+        """Returns the events recorded so far and forgets them"""
+        events, self.events = self.events, []
+        return events
+
+    def extend(self, events: list[Event]):
+        self.events.extend(events)
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """Returns the events in the Chrome Trace Event format, times in microseconds"""
+        trace = []
+        for phase, name, category, start, duration, pid, tid, args in self.events:
+            event = {'ph': phase, 'name': name, 'pid': pid, 'tid': tid}
+            if phase == 'X':
+                event.update(cat=category, ts=start * 1e6, dur=duration * 1e6)
+            if args:
+                event['args'] = args
+            trace.append(event)
+        return trace
+
+    def save(self, path: str | os.PathLike):
+        """Writes the events to a JSON trace file"""
+        with open(path, 'w') as file:
+            json.dump({'traceEvents': self.trace_events(), 'displayTimeUnit': 'ms'}, file, default=str)
+
+
+# Tracer of the current process.
+tracer = Tracer()
@@ -0,0 +1,159 @@
+"""Transports moving the samples and results of a benchmark between processes.
+Large numpy arrays are sent out-of-band through shared memory, only small handles are pickled."""
+import functools
+import io
+import os
+import secrets
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Protocol
+
+import dill
+import numpy as np
+
+
+class Transport(Protocol):
+    def pack(self, value: Any) -> Any:
+        pass
+
+    def unpack(self, packed: Any) -> Any:
+        pass
+
+
+@dataclass
+class Packed:
+    """Handle of a packed value: its pickle and the shared memory segment holding its large buffers"""
+    data: bytes
+    segment: str | None = None
+    buffers: list[tuple[int, int, bool]] = field(default_factory=list)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes moved through shared memory"""
+        return sum(size for _, size, _ in self.buffers)
+
+
+class _Pickler(dill.Pickler):
+    def __init__(self, file, min_bytes: int, **kwargs) -> None:
+        super().__init__(file, **kwargs)
+        self.min_bytes = min_bytes
+
+    def reducer_override(self, obj):
+        # dill pickles arrays in-band, large plain arrays use the out-of-band reduction of numpy instead
+        if type(obj) is np.ndarray and obj.nbytes >= self.min_bytes:
+            return obj.__reduce_ex__(5)
+        return NotImplemented
+
+
+_ALIGNMENT = 64
+
+
+# directory listing the POSIX shared memory segments, where the segments left by a failed run are looked for
+_SHM_DIR = '/dev/shm'
+
+
+@functools.cache
+def _received_segment_class():
+    from multiprocess.shared_memory import SharedMemory
+
+    class ReceivedSegment(SharedMemory):
+        """Segment closed by `unpack` once the last array built over it is garbage collected.
+        At exit, arrays may still be alive when it is collected: closing it fails then and the OS unmaps it."""
+
+        def __del__(self):
+            try:
+                self.close()
+            except (OSError, BufferError):
+                pass
+    return ReceivedSegment
+
+
+class SharedMemoryTransport:
+    """SharedMemoryTransport packs the numpy arrays of at least `min_bytes` bytes of a value into a shared memory
+    segment and pickles the rest of the value with the handle of the segment.
+
+    The receiving process owns the segment: `unpack` unlinks it as soon as it is mapped, so that it cannot be
+    received twice. The arrays built over it keep the mapping alive, it is unmapped once they are all garbage
+    collected. Segments that are never received (e.g. when a worker fails) are unlinked by `release`, which `Benchmark`
+    calls at the end of every run, or by the resource tracker of the parent process when it exits."""
+
+    def __init__(self, min_bytes: int = 1 << 16) -> None:
+        """Constructor of SharedMemoryTransport
+
+        :param int min_bytes: minimum size of the arrays sent through shared memory, smaller ones are pickled.
+        """
+        self.min_bytes = min_bytes
+        # shared by the copies of the transport in the workers, it tells the segments of this transport apart
+        self.prefix = f'octopipes_{secrets.token_hex(4)}_'
+
+    @staticmethod
+    def ensure_tracker():
+        """Starts the resource tracker so that the processes forked afterwards share it with this one"""
+        from multiprocess import resource_tracker
+
+        resource_tracker.ensure_running()
+
+    def pack(self, value: Any) -> Packed:
+        from multiprocess.shared_memory import SharedMemory
+
+        buffers: list[memoryview] = []
+
+        def out_of_band(buffer) -> bool:
+            buffers.append(buffer.raw())
+            return False
+
+        file = io.BytesIO()
+        _Pickler(file, self.min_bytes, protocol=5, buffer_callback=out_of_band).dump(value)
+        if not buffers:
+            return Packed(file.getvalue())
+
+        layout, offset = [], 0
+        for buffer in buffers:
+            layout.append((offset, buffer.nbytes, buffer.readonly))
+            offset += -(-buffer.nbytes // _ALIGNMENT) * _ALIGNMENT
+        segment = SharedMemory(name=f'{self.prefix}{secrets.token_hex(8)}', create=True, size=max(offset, 1))
+        try:
+            for (start, size, _), buffer in zip(layout, buffers):
+                segment.buf[start:start + size] = buffer
+        except BaseException:
+            segment.close()
+            segment.unlink()
+            raise
+        segment.close()
+        return Packed(file.getvalue(), segment.name, layout)
+
+    def unpack(self, packed: Any) -> Any:
+        if not isinstance(packed, Packed):
+            return packed
+        if packed.segment is None:
+            return dill.loads(packed.data)
+
+        segment = _received_segment_class()(name=packed.segment)
+        segment.unlink()
+        # the unpickled arrays are views of `mapping`, whose base is the memoryview numpy took of the segment.
+        # The segment is closed once this memoryview is garbage collected, after it released the buffer of the segment.
+        mapping = np.frombuffer(segment.buf, dtype=np.uint8)
+        weakref.finalize(mapping.base, segment.close).atexit = False
+        buffers = []
+        for start, size, readonly in packed.buffers:
+            buffer = mapping[start:start + size]
+            if readonly:
+                buffer = buffer.view()
+                buffer.flags.writeable = False
+            buffers.append(buffer)
+        return dill.Unpickler(io.BytesIO(packed.data), buffers=buffers).load()
+
+    def release(self):
+        """Unlinks the segments packed with this transport and never received, once no process uses them anymore.
+        The segments are found in /dev/shm, elsewhere they are left to the resource tracker."""
+        if not os.path.isdir(_SHM_DIR):
+            return
+        from multiprocess.shared_memory import SharedMemory
+
+        for name in os.listdir(_SHM_DIR):
+            if not name.startswith(self.prefix):
+                continue
+            try:
+                SharedMemory(name=name).unlink()
+            except FileNotFoundError:
+                pass
@@ -1,24 +1,73 @@
 import time
 import logging
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
 from typing import Any
 from collections.abc import Callable
 
-from octopipes.results import Results, Step
+from octopipes.cache import StepCache, step_identity
+from octopipes.results import LazyResults, Results, Step
+from octopipes.writer import ImageWriter
 from octopipes.handlers import DefaultHandler, HandlerInterface
+from octopipes.tracing import tracer
 from octopipes import utils
 
 
 logger = logging.getLogger(__name__)
 
 
+# An injection plan is the list of (is_dependency, index) arguments to gather for a step.
+# Output indices start from 0 for the input of the workflow.
+Plan = tuple[tuple[bool, int], ...]
+
+
+def compile_requires(requires: str | None, step: int, chain: bool = True) -> Plan:
+    """Validates the requires string of a step and compiles it into an injection plan.
+    The previous output is dropped from the plan of chained steps as it is injected automatically.
+
+    :param str | None requires: requires string such as '0,d1,2'.
+    :param int step: index of the step in the workflow (starting from 0).
+    :param bool chain: whether the previous output is injected automatically.
+    :raises ValueError: if the requires string is malformed or references an output not available yet.
+    """
+    if requires is None:
+        return ()
+
+    plan = []
+    for token in requires.split(','):
+        token = token.strip()
+        dependency = token.startswith('d')
+        index = token[1:] if dependency else token
+        if not index.isdigit():
+            raise ValueError(f'invalid requires string {requires!r}: {token!r} is not an output or a dependency')
+        index = int(index)
+        if not dependency:
+            if index > step:
+                raise ValueError(f'invalid requires string {requires!r}: output {index} is not available at step {step}')
+            if index == step and chain:
+                continue
+        plan.append((dependency, index))
+    return tuple(plan)
+
+
 class Workflow:
     """Workflow allows the difinition of multiple processes/steps"""
     
     def __init__(self, name: str,
                  steps: list[tuple[Callable, HandlerInterface]] = list(),
-                 metadata: dict = {}) -> None:
+                 metadata: dict = {}, lean: bool = False, keep: tuple[int, ...] = ()) -> None:
+        """Constructor of Workflow
+
+        :param str name: name of the workflow.
+        :param list steps: list of (process, handler) steps of the workflow.
+        :param dict metadata: metadata differentiating workflows with the same name.
+        :param bool lean: if set, the intermediate outputs are released (set to None) as soon as no later step requires them.
+                          The final output is always kept.
+        :param tuple[int, ...] keep: indices of the outputs to keep in lean mode (e.g. to draw them with `output_on_image`).
+        """
         self.name = name
         self.metadata = dict(metadata)
+        self.lean = lean
+        self.keep = tuple(keep)
         
         try:
             processes, handlers = zip(*list(steps))
@@ -27,20 +76,34 @@ class Workflow:
 
         self.processes: list[Callable] = list(processes)  # type: ignore
         self.handlers: list[HandlerInterface] = list(handlers)  # type: ignore
-        self.requires: list[str | None] = []
+        self.requires: list[str | None] = [None] * len(self.processes)
+        self.plans: list[Plan] = [()] * len(self.processes)
+        self.batched: list[bool] = [False] * len(self.processes)
+        self.stacked: list[bool] = [False] * len(self.processes)
+        self.chained: list[bool] = [True] * len(self.processes)
+        self.caches: list[StepCache | None] = [None] * len(self.processes)
+        self.cache_keys: list[str | None] = [None] * len(self.processes)
+        self.step_hooks: list[tuple[Callable | None, Callable | None]] = []
 
     @property
     def metadata_name(self):
-        return f'{self.name}{"".join(f"({key}:{value})" for key, value in self.metadata)}'
+        return f'{self.name}{"".join(f"({key}:{value})" for key, value in self.metadata.items())}'
 
     @property
     def nsteps(self):
         return len(self.processes)
 
+    @property
+    def ndependencies(self) -> int:
+        """Minimum number of dependencies required to run the workflow"""
+        return max((index + 1 for plan in self.plans for dependency, index in plan if dependency), default=0)
+
     def __len__(self):
         return self.nsteps
 
-    def add(self, process: Callable, handler: HandlerInterface = DefaultHandler(), requires: str | None = None):
+    def add(self, process: Callable, handler: HandlerInterface = DefaultHandler(), requires: str | None = None,
+            batched: bool = False, stack: bool = False, chain: bool = True,
+            cache: StepCache | None = None, cache_key: str | None = None):
         """Adds a new process to the workflow.
 
         Parameters:
@@ -48,15 +111,169 @@ class Workflow:
             handler: Additional handler for the output of the process
             requires: Set additional inputs required other than the strictly previous one.
                         The requires string should be in this form '0,1,2' where the numbers are the output of the process to inject.
+            batched: When running a batch of inputs (see `batch`), the process is called once with the list of inputs of the
+                        batch (and the lists of the required inputs) and should return one output per input.
+                        Other processes are called once per input. When running a single input, it is called with a batch of one.
+            stack: Batched processes receive their main input as a stacked numpy array instead of a list.
+            chain: If unset, the output of the previous step is not injected automatically and the process only receives
+                        the inputs of `requires`. This allows independent branches that `run_parallel` runs concurrently.
+            cache: Cache memoizing the outputs of the process by the identity of the process and the hash of its inputs.
+            cache_key: Identity of the process in the cache. If None, it is derived from its name, code and closure.
+        Raises:
+            ValueError: if the requires string is invalid or a batched step is cached.
         """
+        plan = compile_requires(requires, self.nsteps, chain=chain)
+        if cache is not None and batched:
+            raise ValueError('batched steps cannot be cached')
         self.processes.append(process)
         self.handlers.append(handler)
         self.requires.append(requires)
+        self.plans.append(plan)
+        self.batched.append(batched)
+        self.stacked.append(stack)
+        self.chained.append(chain)
+        self.caches.append(cache)
+        self.cache_keys.append(None if cache is None else cache_key or step_identity(process))
+        return self
+
+    def add_step_hook(self, hook: Any = None, before: Callable | None = None, after: Callable | None = None):
+        """Adds hooks called around every step of the runs of the workflow, outside of the timing of the step.
+
+        Parameters:
+            hook: object whose `before_step` and `after_step` methods are used as `before` and `after`.
+            before: called as `before(run, step)` before the step, it returns a token passed to `after`.
+            after: called as `after(run, step, output, token)` after the step. It can return a dict of fields
+                        added to the recap of the step (see `Results.output_recap`).
+        """
+        if hook is not None:
+            before = before or getattr(hook, 'before_step', None)
+            after = after or getattr(hook, 'after_step', None)
+        self.step_hooks.append((before, after))
         return self
 
+    def _before_step(self, run: 'WorkflowIter', step: int) -> list[Any]:
+        return [before(run, step) if before is not None else None for before, _ in self.step_hooks]
+
+    def _after_step(self, run: 'WorkflowIter', step: int, output: Any, tokens: list[Any]) -> dict[str, Any] | None:
+        metrics = None
+        for (_, after), token in zip(self.step_hooks, tokens):
+            if after is not None and (fields := after(run, step, output, token)):
+                metrics = {**metrics, **fields} if metrics else dict(fields)
+        return metrics
+
     def __call__(self, input: Any, dependencies: list | None = None, *args: Any, **kwds: Any) -> 'WorkflowIter':
         return Workflow.WorkflowIter(self, input, dependencies=dependencies)
 
+    def compile(self, timed: bool = False) -> 'CompiledWorkflow':
+        """Returns a callable running the whole workflow on an input and returning its final output, with the least
+        overhead per call: requires are resolved ahead of time and nothing else than the outputs consumed by later
+        steps is kept. Later changes to the workflow are not seen by the compiled workflow.
+
+        :param bool timed: if set, the callable returns the output and the durations of the steps.
+        :raises ValueError: if the workflow has step hooks.
+        """
+        return CompiledWorkflow(self, timed=timed)
+
+    def batch(self, inputs: list, dependencies: list[list | None] | None = None) -> list['WorkflowIter']:
+        """Runs the workflow on a batch of inputs and returns the finished run of every input.
+        Batched steps are called once for the whole batch, their duration is split evenly between the inputs.
+        Their step hooks are called once with the run of the first input, their fields cover the whole batch.
+
+        :param list inputs: inputs of the batch.
+        :param list | None dependencies: dependencies of every input of the batch.
+        """
+        if dependencies is None:
+            dependencies = [None] * len(inputs)
+        if len(dependencies) != len(inputs):
+            raise ValueError(f'got {len(dependencies)} dependencies for {len(inputs)} inputs')
+
+        runs = [iter(self(input, dependencies=deps)) for input, deps in zip(inputs, dependencies)]
+        if not runs:
+            return runs
+        for step, process in enumerate(self.processes):
+            if not self.batched[step]:
+                for run in runs:
+                    next(run)
+                continue
+
+            arguments = [run._arguments(step) for run in runs]
+            tokens = self._before_step(runs[0], step) if self.step_hooks else None
+            start = time.perf_counter()
+            outputs = self._call_batched(step, arguments)
+            end = time.perf_counter()
+            if tracer.enabled:
+                tracer.complete(self.processes[step].__name__, 'step', start, end,
+                                {'workflow': self.name, 'batch': len(runs)})
+            metrics = self._after_step(runs[0], step, outputs, tokens) if tokens is not None else None
+            for run, output in zip(runs, outputs):
+                run._record(output, (end - start) / len(runs), metrics=metrics)
+        return runs
+
+    def run_batch(self, inputs: list, dependencies: list[list | None] | None = None) -> list[Results]:
+        """Runs the workflow on a batch of inputs (see `batch`) and returns the results of every input"""
+        return [run.freeze() for run in self.batch(inputs, dependencies=dependencies)]
+
+    def _call_batched(self, step: int, arguments: list[list]) -> list:
+        # calls a batched step with the arguments of every input transposed into columns.
+        process = self.processes[step]
+        columns = [list(column) for column in zip(*arguments)]
+        if self.stacked[step]:
+            import numpy as np
+            columns[0] = np.stack(columns[0])
+
+        outputs = process(*columns)
+        if len(outputs) != len(arguments):
+            raise ValueError(f'batched step {process.__name__!r} returned {len(outputs)} outputs for {len(arguments)} inputs')
+        return list(outputs)
+
+    def step_key(self, step: int) -> tuple:
+        """Returns the identity of a step: steps with the same key and the same history compute the same output"""
+        return (self.processes[step], self.plans[step], self.chained[step], self.batched[step], self.stacked[step])
+
+    def graph(self) -> list[set[int]]:
+        """Returns for every step the steps whose outputs it consumes (through chaining or `requires`)"""
+        graph = []
+        for step, plan in enumerate(self.plans):
+            predecessors = {index - 1 for dependency, index in plan if not dependency and index > 0}
+            if self.chained[step] and step > 0:
+                predecessors.add(step - 1)
+            graph.append(predecessors)
+        return graph
+
+    def run_parallel(self, input: Any, dependencies: list | None = None,
+                     executor: Executor | None = None, max_workers: int | None = None) -> 'WorkflowIter':
+        """Runs the workflow as a graph of steps: independent branches run concurrently on a thread pool.
+        This suits steps that release the GIL (numpy, cv2, torch, ...). Returns the finished run.
+
+        :param Any input: input of the workflow.
+        :param list | None dependencies: dependencies of the workflow.
+        :param Executor | None executor: executor to run the steps on, a thread pool of `max_workers` is used if None.
+        :param int | None max_workers: number of threads of the pool created if no executor is given.
+        """
+        run = self(input, dependencies=dependencies)
+        if executor is not None:
+            return run.run_parallel(executor)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return run.run_parallel(executor)
+
+    def release_schedule(self) -> list[list[int]]:
+        """Returns for every step the indices of the outputs that are not needed anymore once it has run.
+        An output is needed by the next step and by the steps requiring it, the final output and the outputs
+        in `keep` are never released."""
+        if self.nsteps == 0:
+            return []
+        last_use = list(range(self.nsteps))
+        for step, predecessors in enumerate(self.graph()):
+            for output in predecessors:
+                last_use[output] = max(last_use[output], step)
+
+        kept = {index % self.nsteps for index in self.keep} | {self.nsteps - 1}
+        schedule: list[list[int]] = [[] for _ in range(self.nsteps)]
+        for output, step in enumerate(last_use):
+            if output not in kept and step < self.nsteps:
+                schedule[step].append(output)
+        return schedule
+
     class WorkflowIter:
         def __init__(self, workflow: 'Workflow', input, dependencies: list | None = None) -> None:
             self.workflow = workflow
@@ -64,6 +281,12 @@ class Workflow:
             self.outputs = []
             self.dependencies = list(dependencies) if dependencies else []
             self.durations : list[float] = []
+            self.cache_hits: list[bool | None] = []
+            self.step_metrics: list[dict[str, Any] | None] = []
+            if len(self.dependencies) < workflow.ndependencies:
+                raise ValueError(f'workflow {workflow.name!r} requires {workflow.ndependencies} dependencies '
+                                 f'but {len(self.dependencies)} were given')
+            self._releases = workflow.release_schedule() if workflow.lean else None
 
         def __iter__(self):
             self.current_step = 0
@@ -72,49 +295,126 @@ class Workflow:
 
         def __next__(self):
             if self.current_step < self.workflow.nsteps:
-                self.current_step += 1
+                process = self.workflow.processes[self.current_step]
 
-                start = time.perf_counter()
-                if (requires := self.workflow.requires[self.current_step - 1]) is not None:
-                    injected_inputs = self._parse_requires(requires)
-                    input = [self.current_output] + injected_inputs
+                if self.workflow.caches[self.current_step] is not None or self.workflow.step_hooks:
+                    self._record(*self._call(self.current_step))
+                    return process.__name__, self.current_output
 
-                    self.current_output = self.workflow.processes[self.current_step - 1](*input)
+                start = time.perf_counter()
+                if self.workflow.batched[self.current_step]:
+                    output = self.workflow._call_batched(self.current_step, [self._arguments(self.current_step)])[0]
+                elif not self.workflow.chained[self.current_step]:
+                    output = process(*self._gather(self.workflow.plans[self.current_step]))
+                elif plan := self.workflow.plans[self.current_step]:
+                    output = process(self.current_output, *self._gather(plan))
                 else:
-                    self.current_output = self.workflow.processes[self.current_step - 1](self.current_output)
+                    output = process(self.current_output)
 
                 end = time.perf_counter()
-                self.outputs.append(self.current_output)
-                self.durations.append(end - start)
-                step_name = self.workflow.processes[self.current_step - 1].__name__
+                if tracer.enabled:
+                    tracer.complete(process.__name__, 'step', start, end, {'workflow': self.workflow.name})
+                self._record(output, end - start)
 
-                return step_name, self.current_output
+                return process.__name__, output
 
             raise StopIteration
 
-        def _parse_requires(self, requires: str) -> list[Any]:
-            # get the outputs that need to be injected.
-            # if the previous step is in the requires string, it should ignored (as it injected automatically).
-            input = []
-            for step in requires.split(','):
-                if step.startswith('d'):
-                    step = step[1:]
-                    try:
-                        input.append(self.dependencies[int(step)])
-                    except Exception as e:
-                        logger.error(f'encountered an error while parsing requires string {requires!r} due to {e}')
-                else:
-                    try:
-                        output = int(step)
-                        if output != self.current_step - 1:
-                            if output == 0 :
-                                input.append(self.input)
-                            else :
-                                input.append(self.outputs[output-1])
-                    except Exception as e:
-                        logger.error(f'encountered an error while parsing requires string {requires!r} due to {e}')
-
-            return input
+        def _record(self, output, duration: float, cached: bool | None = None, metrics: dict[str, Any] | None = None):
+            # saves the output of the current step and moves to the next one.
+            self.current_step += 1
+            self.current_output = output
+            self.outputs.append(output)
+            self.durations.append(duration)
+            self.cache_hits.append(cached)
+            self.step_metrics.append(metrics)
+            if self._releases is not None:
+                for released in self._releases[self.current_step - 1]:
+                    self.outputs[released] = None
+
+        def _gather(self, plan: Plan) -> list[Any]:
+            # get the outputs and dependencies that need to be injected.
+            return [self.dependencies[index] if dependency else (self.outputs[index - 1] if index else self.input)
+                    for dependency, index in plan]
+
+        def _arguments(self, step: int) -> list[Any]:
+            # all the arguments of a step, including the previous output if the step is chained.
+            arguments = self._gather(self.workflow.plans[step])
+            if self.workflow.chained[step]:
+                arguments.insert(0, self.outputs[step - 1] if step else self.input)
+            return arguments
+
+        def _call(self, step: int) -> tuple[Any, float, bool | None, dict[str, Any] | None]:
+            # runs a step, returns its output, its duration, whether it was cached (None if the step has no cache)
+            # and the fields of its step hooks.
+            arguments = self._arguments(step)
+            tokens = self.workflow._before_step(self, step) if self.workflow.step_hooks else None
+            start = time.perf_counter()
+            cached = None
+            if (cache := self.workflow.caches[step]) is not None:
+                key = cache.key(self.workflow.cache_keys[step], arguments)
+                cached, output = cache.get(key)
+                if not cached:
+                    output = self._invoke(step, arguments)
+                    cache.put(key, output)
+            else:
+                output = self._invoke(step, arguments)
+            end = time.perf_counter()
+            duration = end - start
+            if tracer.enabled:
+                tracer.complete(self.workflow.processes[step].__name__, 'step', start, end,
+                                {'workflow': self.workflow.name, 'cached': cached})
+            metrics = self.workflow._after_step(self, step, output, tokens) if tokens is not None else None
+            return output, duration, cached, metrics
+
+        def _invoke(self, step: int, arguments: list[Any]) -> Any:
+            if self.workflow.batched[step]:
+                return self.workflow._call_batched(step, [arguments])[0]
+            return self.workflow.processes[step](*arguments)
+
+        def run_parallel(self, executor: Executor) -> 'Workflow.WorkflowIter':
+            """Runs all the steps on `executor` as soon as the outputs they consume are available"""
+            nsteps = self.workflow.nsteps
+            graph = self.workflow.graph()
+            successors: list[list[int]] = [[] for _ in range(nsteps)]
+            for step, predecessors in enumerate(graph):
+                for predecessor in predecessors:
+                    successors[predecessor].append(step)
+            waiting = [len(predecessors) for predecessors in graph]
+            consumers = [len(steps) for steps in successors]
+            kept = {index % nsteps for index in self.workflow.keep} | {nsteps - 1} if nsteps else set()
+
+            self.outputs = [None] * nsteps
+            self.durations = [0.0] * nsteps
+            self.cache_hits = [None] * nsteps
+            self.step_metrics = [None] * nsteps
+            running = {executor.submit(self._call, step): step for step in range(nsteps) if not waiting[step]}
+            try:
+                while running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        step = running.pop(future)
+                        (self.outputs[step], self.durations[step],
+                         self.cache_hits[step], self.step_metrics[step]) = future.result()
+                        if self.workflow.lean and not consumers[step] and step not in kept:
+                            self.outputs[step] = None
+                        for successor in successors[step]:
+                            waiting[successor] -= 1
+                            if not waiting[successor]:
+                                running[executor.submit(self._call, successor)] = successor
+                        if self.workflow.lean:
+                            for predecessor in graph[step]:
+                                consumers[predecessor] -= 1
+                                if not consumers[predecessor] and predecessor not in kept:
+                                    self.outputs[predecessor] = None
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+
+            self.current_step = nsteps
+            self.current_output = self.outputs[-1] if nsteps else self.input
+            return self
 
         def recap(self, capture=False):
             output = ''
@@ -125,7 +425,11 @@ class Workflow:
             print(output)
 
         
-        def output_on_image(self, image, output=-1, save_to_file=True, path: str | None = None) -> None:
+        def output_on_image(self, image, output=-1, save_to_file=True, path: str | None = None,
+                            writer: ImageWriter | None = None) -> None:
+            """Draws the output of a step on a copy of `image` using the corresponding handler,
+            then saves it to `path` or shows it.
+            If a `writer` is given, the drawing and the writing are done in the background by the writer."""
             import cv2
 
             handler = self.workflow.handlers[output]
@@ -133,6 +437,12 @@ class Workflow:
             if output is None:
                 return
 
+            if save_to_file and writer is not None:
+                if path is None:
+                    raise ValueError('save_to_file set but path is None')
+                writer.submit_render(handler, image, output, path)
+                return
+
             img = image.copy()
             img : Any = handler.output_on_image(img, output)
 
@@ -155,7 +465,7 @@ class Workflow:
             return handler.to_json(output)
 
         def steps_recap(self) -> tuple[Step, ...]:
-            return tuple({'step': process.__name__, 'duration': d} for process, d in zip(self.workflow.processes, self.durations))
+            return self._freeze(lazy=True, compact=False).output_recap
 
         @property
         def total_duration(self):
@@ -172,7 +482,35 @@ class Workflow:
 
             return handler.len_output(output) 
 
-        def freeze(self) -> Results:
+        def compact_output(self, output: int = -1) -> Any:
+            """Returns the compact encoding of the output of a step using the corresponding handler"""
+            handler = self.workflow.handlers[output]
+            output = self.outputs[output]
+
+            return handler.to_compact(output)
+
+        def freeze(self, lazy: bool = False, compact: bool = False) -> Results | LazyResults:
+            """Returns a frozen instance of the run.
+
+            :param bool lazy: if set, returns a lightweight `LazyResults` whose handler based fields are computed on demand.
+            :param bool compact: if set, the compact encoding of the output is computed as well (see `HandlerInterface.to_compact`).
+            """
+            with tracer.span('freeze', 'freeze', {'workflow': self.workflow.name} if tracer.enabled else None):
+                return self._freeze(lazy, compact)
+
+        def _freeze(self, lazy: bool, compact: bool) -> Results | LazyResults:
+            if lazy:
+                return LazyResults(name=self.workflow.name,
+                                   metadata_name=self.workflow.metadata_name,
+                                   metadata=self.workflow.metadata,
+                                   nsteps=self.workflow.nsteps,
+                                   current_step=self.current_step,
+                                   output=self.current_output,
+                                   handler=self.workflow.handlers[-1],
+                                   steps=tuple(process.__name__ for process in self.workflow.processes[:len(self.durations)]),
+                                   durations=tuple(self.durations),
+                                   cache_hits=tuple(self.cache_hits),
+                                   metrics=tuple(self.step_metrics))
             return Results(name=self.workflow.name,
                            metadata_name=self.workflow.metadata_name,
                            metadata=self.workflow.metadata,
@@ -182,4 +520,103 @@ class Workflow:
                            len_output=self.len_output(),
                            total_duration=self.total_duration,
                            output_recap=self.steps_recap(),
-                           json_output=self.json_output())
+                           json_output=self.json_output(),
+                           **({'compact_output': self.compact_output()} if compact else {}))
+
+
+class CompiledWorkflow:
+    """CompiledWorkflow runs all the steps of a workflow in a single call and returns the final output (see `Workflow.compile`).
+
+    The requires strings are resolved once into the few outputs that later steps consume: no iterator, step names or
+    intermediate outputs are kept. Only the outputs consumed by later steps are stored, in a list allocated per call,
+    so a compiled workflow can be called from several threads at once. It is a snapshot of the steps of the workflow
+    at the time it was compiled."""
+
+    def __init__(self, workflow: Workflow, timed: bool = False) -> None:
+        """Constructor of CompiledWorkflow
+
+        :param Workflow workflow: workflow to compile.
+        :param bool timed: if set, calls return the output and the list of the durations of the steps.
+        :raises ValueError: if the workflow has step hooks, they need the runs of a `WorkflowIter`.
+        """
+        if workflow.step_hooks:
+            raise ValueError(f'workflow {workflow.name!r} has step hooks and cannot be compiled')
+        self.name = workflow.name
+        self.timed = timed
+        self.ndependencies = workflow.ndependencies
+
+        # outputs consumed by later steps (0 is the input) are stored in consecutive slots
+        consumed = sorted({index for plan in workflow.plans for dependency, index in plan if not dependency})
+        slots = {index: slot for slot, index in enumerate(consumed)}
+        self._nslots = len(consumed)
+        self._input_slot = slots.get(0)
+        steps = []
+        for step in range(workflow.nsteps):
+            sources = tuple((dependency, index if dependency else slots[index]) for dependency, index in workflow.plans[step])
+            steps.append((self._process(workflow, step), workflow.chained[step], sources, slots.get(step + 1)))
+        self._steps = tuple(steps)
+
+    @staticmethod
+    def _process(workflow: Workflow, step: int) -> Callable:
+        # the callable of a step, batched steps run a batch of one and cached steps go through their cache.
+        process = workflow.processes[step]
+        if workflow.batched[step]:
+            def process(*arguments):
+                return workflow._call_batched(step, [list(arguments)])[0]
+        if (cache := workflow.caches[step]) is not None:
+            uncached, identity = process, workflow.cache_keys[step]
+
+            def process(*arguments):
+                key = cache.key(identity, list(arguments))
+                cached, output = cache.get(key)
+                if not cached:
+                    output = uncached(*arguments)
+                    cache.put(key, output)
+                return output
+        return process
+
+    def _saved(self, input, dependencies) -> list:
+        if len(dependencies) < self.ndependencies:
+            raise ValueError(f'workflow {self.name!r} requires {self.ndependencies} dependencies '
+                             f'but {len(dependencies)} were given')
+        saved = [None] * self._nslots
+        if self._input_slot is not None:
+            saved[self._input_slot] = input
+        return saved
+
+    def __call__(self, input: Any, dependencies: list | tuple | None = ()) -> Any:
+        if dependencies is None:
+            dependencies = ()
+        if self.timed:
+            return self._run_timed(input, dependencies)
+        saved = self._saved(input, dependencies) if self._nslots or self.ndependencies else None
+        output = input
+        for process, chained, sources, slot in self._steps:
+            if sources:
+                arguments = [dependencies[index] if dependency else saved[index] for dependency, index in sources]
+                output = process(output, *arguments) if chained else process(*arguments)
+            elif chained:
+                output = process(output)
+            else:
+                output = process()
+            if slot is not None:
+                saved[slot] = output
+        return output
+
+    def _run_timed(self, input: Any, dependencies: list | tuple) -> tuple[Any, list[float]]:
+        saved = self._saved(input, dependencies)
+        durations = []
+        output = input
+        for process, chained, sources, slot in self._steps:
+            start = time.perf_counter()
+            if sources:
+                arguments = [dependencies[index] if dependency else saved[index] for dependency, index in sources]
+                output = process(output, *arguments) if chained else process(*arguments)
+            elif chained:
+                output = process(output)
+            else:
+                output = process()
+            durations.append(time.perf_counter() - start)
+            if slot is not None:
+                saved[slot] = output
+        return output, durations
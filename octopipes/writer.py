@@ -0,0 +1,160 @@
+"""Background writer encoding and saving images on a thread pool"""
+import logging
+import os
+import pathlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_params(ext: str, quality: int | None) -> list[int]:
+    import cv2
+
+    if quality is None:
+        return []
+    ext = ext.lower()
+    if ext in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if ext == '.webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if ext == '.png':
+        # quality is mapped to the png compression level (0-9), lower compression being faster
+        return [cv2.IMWRITE_PNG_COMPRESSION, quality]
+    return []
+
+
+class ImageWriter:
+    """ImageWriter takes render jobs into a bounded queue and draws, encodes and writes them on a thread pool.
+    `submit` blocks while `max_pending` jobs are in flight. `flush` waits for the pending jobs and `close` stops the writer.
+
+    The writer can be shared with the workers of a `Benchmark`: every process starts its own threads
+    and flushes them when it exits."""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 32,
+                 ext: str | None = None, quality: int | None = None) -> None:
+        """Constructor of ImageWriter
+
+        :param int max_workers: number of threads encoding and writing images.
+        :param int max_pending: maximum number of jobs in flight before `submit` blocks.
+        :param str | None ext: format of the images (e.g. '.jpg'), replaces the suffix of the paths if set.
+        :param int | None quality: jpeg/webp quality or png compression level.
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ext = ext
+        self.quality = quality
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._executor: ThreadPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending: set[Future] = set()
+        self._directories: set[pathlib.Path] = set()
+
+    def __getstate__(self):
+        return {'max_workers': self.max_workers, 'max_pending': self.max_pending,
+                'ext': self.ext, 'quality': self.quality}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._pid != os.getpid():
+            # threads do not survive a fork, the child process starts its own writer.
+            self._reset()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='octopipes-writer')
+            try:
+                from multiprocess.util import Finalize
+                Finalize(None, self.close, exitpriority=10)
+            except ImportError:
+                pass
+        return self._executor
+
+    def submit(self, image, path: str | pathlib.Path) -> Future:
+        """Queues an image to be encoded and written to `path`"""
+        return self._submit(self._write, image, path)
+
+    def submit_render(self, handler, image, output, path: str | pathlib.Path) -> Future:
+        """Queues the drawing of `output` with `handler` on a copy of `image`, then its encoding and writing to `path`"""
+        return self._submit(self._render, handler, image.copy(), output, path)
+
+    def _submit(self, job, *args) -> Future:
+        executor = self._get_executor()
+        self._slots.acquire()
+        try:
+            future = executor.submit(job, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future):
+        # failed jobs are kept until `flush` reports them
+        if not future.cancelled() and (error := future.exception()) is not None:
+            logger.error(f'failed to write image due to {error}')
+        else:
+            with self._lock:
+                self._pending.discard(future)
+        self._slots.release()
+
+    def _render(self, handler, image, output, path):
+        self._write(handler.output_on_image(image, output), path)
+
+    def _write(self, image: Any, path: str | pathlib.Path):
+        import cv2
+
+        path = pathlib.Path(path)
+        if self.ext is not None:
+            path = path.with_suffix(self.ext)
+        if path.parent not in self._directories:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._directories.add(path.parent)
+
+        ok, buffer = cv2.imencode(path.suffix, image, _encode_params(path.suffix, self.quality))
+        if not ok:
+            raise ValueError(f'could not encode image {path}')
+        with open(path, 'wb') as file:
+            file.write(buffer.data)
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs in flight"""
+        with self._lock:
+            return sum(not future.done() for future in self._pending)
+
+    def flush(self):
+        """Waits for all the jobs submitted so far. Raises the first error of the jobs if any."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+        with self._lock:
+            self._pending.difference_update(pending)
+        for future in pending:
+            if not future.cancelled() and (error := future.exception()) is not None:
+                raise error
+
+    def close(self):
+        """Flushes the pending jobs and stops the threads"""
+        if self._pid != os.getpid() or self._executor is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -17,17 +17,19 @@ setup(
     url='https://github.com/octomiro/octopipes',
     long_description=README,
     long_description_content_type='text/markdown',
-    packages=find_packages(exclude=('tests*', 'testing*')),
+    packages=find_packages(exclude=('tests*', 'testing*', 'benchmarks*')),
     install_requires=[
         'pydantic',
         'multiprocess',
+        'dill',
         'numpy',
         'tqdm',
         'cmap'
     ],
     extras_require={
         'opencv': ['opencv-python'],
-        'pytorch': ['torch', 'torchvision']
+        'pytorch': ['torch', 'torchvision'],
+        'parquet': ['pyarrow']
     },
     classifiers=[
         'Programming Language :: Python :: 3.11',
@@ -1,3 +1,5 @@
+import copy
+
 from octopipes.aggregate_flows import AggregateFlows
 from octopipes.workflow import Workflow
 
@@ -29,3 +31,85 @@ def test_aggregateflows_with_dependencies():
     assert flows.results[0].output == 4
     assert flows.results[1].output == 0
 
+
+
+def test_aggregateflows_merge():
+    wf1 = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)
+    wf2 = Workflow('test_wf_2')\
+            .add(lambda x: x * 2)
+    flows1 = AggregateFlows(3, workflows=[wf1])
+    flows1.run_workflows()
+    flows2 = AggregateFlows(3, workflows=[wf2])
+    flows2.run_workflows()
+
+    merged = AggregateFlows.merge([flows1, flows2])
+    assert merged.workflows == [wf1, wf2]
+    assert [r.output for r in merged.results] == [4, 6]
+
+
+def test_aggregateflows_share_prefixes():
+    calls = []
+
+    def load(x):
+        calls.append('load')
+        return x + 1
+
+    def embed(x):
+        calls.append('embed')
+        return x * 10
+
+    def threshold(value):
+        def process(x, y):
+            return x > value + y
+        return process
+
+    wf1 = Workflow('test_wf_1')\
+            .add(load)\
+            .add(embed)\
+            .add(threshold(10), requires='0')
+    wf2 = Workflow('test_wf_2')\
+            .add(load)\
+            .add(embed)\
+            .add(threshold(30), requires='0')
+    wf3 = Workflow('test_wf_3')\
+            .add(load)\
+            .add(lambda x: x)
+    wf4 = Workflow('test_wf_4')\
+            .add(load)
+
+    flows = AggregateFlows(2, workflows=[wf1, wf2, wf3, wf4], share_prefixes=True)
+    flows.run_workflows()
+
+    assert calls == ['load', 'embed']
+    assert [r.name for r in flows.results] == ['test_wf_1', 'test_wf_2', 'test_wf_3', 'test_wf_4']
+    assert [r.output for r in flows.results] == [True, False, 3, 3]
+    assert [len(r.output_recap) for r in flows.results] == [3, 3, 2, 1]
+    assert flows.results[0].output_recap[:2] == flows.results[1].output_recap[:2]
+
+
+def test_aggregateflows_copy_shared():
+    def load(x):
+        return [x]
+
+    def append(value):
+        def process(x):
+            x.append(value)
+            return x
+        return process
+
+    wf1 = Workflow('test_wf_1')\
+            .add(load)\
+            .add(append(1))
+    wf2 = Workflow('test_wf_2')\
+            .add(load)\
+            .add(append(2))
+
+    flows = AggregateFlows(0, workflows=[wf1, wf2], share_prefixes=True)
+    flows.run_workflows()
+    # without a copy, the second workflow mutates the output of the first one
+    assert [r.output for r in flows.results] == [[0, 1, 2], [0, 1, 2]]
+
+    flows = AggregateFlows(0, workflows=[wf1, wf2], share_prefixes=True, copy_shared=copy.copy)
+    flows.run_workflows()
+    assert [r.output for r in flows.results] == [[0, 1], [0, 2]]
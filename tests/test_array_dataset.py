@@ -0,0 +1,91 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+from octopipes.array_dataset import ArrayDataset, MappedArray
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader, InputWithDeps
+from octopipes.workflow import Workflow
+
+
+@pytest.fixture
+def images(tmp_path):
+    array = np.arange(5 * 4 * 3, dtype=np.uint8).reshape(5, 4, 3)
+    np.save(tmp_path / 'images.npy', array)
+    return array
+
+
+def test_npy_dataset(tmp_path, images):
+    dataset = ArrayDataset(tmp_path / 'images.npy')
+    assert len(dataset) == 5
+    np.testing.assert_array_equal(dataset[1], images[1])
+    np.testing.assert_array_equal(dataset[-1], images[4])
+    with pytest.raises(IndexError):
+        dataset[5]
+
+    batch = dataset[1:3]
+    assert len(batch) == 2
+    # samples are views of the mapping, not copies
+    assert all(isinstance(sample, MappedArray) and not sample.flags.owndata for sample in batch)
+    assert np.shares_memory(batch[0], dataset.array)
+
+
+def test_raw_dataset(tmp_path, images):
+    (tmp_path / 'images.raw').write_bytes(b'head' + images.tobytes())
+    dataset = ArrayDataset(tmp_path / 'images.raw', dtype=np.uint8, shape=(4, 3), offset=4)
+    assert len(dataset) == 5
+    np.testing.assert_array_equal(dataset[3], images[3])
+
+    with pytest.raises(ValueError):
+        ArrayDataset(tmp_path / 'images.raw')
+
+
+def test_pickle_by_reference(tmp_path, images):
+    dataset = ArrayDataset(tmp_path / 'images.npy')
+    sample = dataset[2]
+    data = pickle.dumps(sample)
+    assert b'images.npy' in data
+    np.testing.assert_array_equal(pickle.loads(data), images[2])
+
+    copy = pickle.loads(pickle.dumps(dataset))
+    assert images.tobytes() not in pickle.dumps(dataset) and len(copy) == 5
+
+    # derived arrays are regular arrays pickled by value
+    derived = sample + 1
+    assert type(derived) is np.ndarray
+    np.testing.assert_array_equal(pickle.loads(pickle.dumps(sample[1:])), images[2][1:])
+
+
+def test_copy_on_write(tmp_path, images):
+    dataset = ArrayDataset(tmp_path / 'images.npy')
+    sample = dataset[0]
+    sample[:] = 0
+    np.testing.assert_array_equal(np.load(tmp_path / 'images.npy'), images)
+
+    with pytest.raises(ValueError):
+        ArrayDataset(tmp_path / 'images.npy', mode='r')[0][:] = 0
+
+
+def test_sidecars(tmp_path, images):
+    (tmp_path / 'labels.json').write_text(json.dumps([0, 1, 2, 3, 4]))
+    np.save(tmp_path / 'depths.npy', np.arange(5, dtype=np.float32))
+    dataset = ArrayDataset(tmp_path / 'images.npy', ground_truth=tmp_path / 'labels.json',
+                           dependencies=[tmp_path / 'depths.npy', ['a', 'b', 'c', 'd', 'e']])
+    input, ground_truth = dataset[3]
+    assert ground_truth == 3
+    assert isinstance(input, InputWithDeps)
+    np.testing.assert_array_equal(input.input, images[3])
+    assert input.dependencies[0] == 3. and input.dependencies[1] == 'd'
+
+    with pytest.raises(ValueError):
+        ArrayDataset(tmp_path / 'images.npy', ground_truth=[0, 1])
+
+
+def test_benchmark_array_dataset(tmp_path, images):
+    dataset = ArrayDataset(tmp_path / 'images.npy', ground_truth=list(range(5)))
+    workflow = Workflow('sum').add(lambda x: int(x.sum()))
+    bench = Benchmark(Dataloader(dataset, batch_size=2), [workflow], processes=2)
+    bench.run_tests()
+    assert [aggregate.results[0].output for aggregate in bench.results] == [int(image.sum()) for image in images]
@@ -1,5 +1,11 @@
-from octopipes.benchmark import Benchmark
+import time
+
+import pytest
+
+from octopipes.aggregate_flows import AggregateFlows, DefaultAggregateFlowsFactory
+from octopipes.benchmark import Benchmark, assemble, in_order
 from octopipes.dataset import Dataloader, Dataset, InputWithDeps
+from octopipes.executors import SerialExecutor
 from octopipes.workflow import Workflow
 
 from tests.test_dataset import MockDataset
@@ -52,3 +58,101 @@ def test_benchmark_with_dependencies():
     assert benchmark.results[0].results[1].output == 0
     assert benchmark.results[1].results[0].output == 3
     assert benchmark.results[1].results[1].output == -1
+
+
+def test_benchmark_persistent_pool():
+    wf1 = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)
+    wf2 = Workflow('test_wf_2')\
+            .add(lambda x: x * 2)
+    dataset: Dataset = MockDataset([1, 2, 3, 4, 5])
+    dataloader = Dataloader(dataset=dataset, batch_size=2)
+    benchmark = Benchmark(dataloader=dataloader, workflows=[wf1, wf2], processes=3, chunksize=2)
+    benchmark.run_tests()
+    assert len(benchmark.results) == 5
+    assert [r.results[0].output for r in benchmark.results] == [2, 3, 4, 5, 6]
+    assert [r.results[1].output for r in benchmark.results] == [2, 4, 6, 8, 10]
+
+
+def test_in_order():
+    assert list(in_order([(2, 'c'), (0, 'a'), (1, 'b'), (3, 'd')])) == ['a', 'b', 'c', 'd']
+
+
+def test_benchmark_worker_initializer():
+    def initializer(workflows):
+        # simulates loading a model once per worker
+        offset = 10
+        return [Workflow('loaded').add(lambda x: x + offset)]
+
+    factory = DefaultAggregateFlowsFactory(hooks=[], initializer=initializer, dependencies=lambda: [100])
+    dataset: Dataset = MockDataset([1, 2, 3])
+    dataloader = Dataloader(dataset=dataset, batch_size=2)
+    benchmark = Benchmark(dataloader=dataloader, workflows=[], flows_factory=factory, processes=2)
+    benchmark.run_tests()
+    assert [r.results[0].name for r in benchmark.results] == ['loaded'] * 3
+    assert [r.results[0].output for r in benchmark.results] == [11, 12, 13]
+    assert benchmark.results[0].dependencies == [100]
+
+
+def test_benchmark_workflow_schedule():
+    def slow(x):
+        time.sleep(0.05)
+        return x + 1
+
+    wf1 = Workflow('slow_wf').add(slow)
+    wf2 = Workflow('fast_wf').add(lambda x: x * 2)
+    dataset: Dataset = MockDataset([(1, 'gt'), (2, 'gt'), (3, 'gt')])
+    dataloader = Dataloader(dataset=dataset, batch_size=2)
+    benchmark = Benchmark(dataloader=dataloader, workflows=[wf1, wf2], processes=2, schedule='workflow')
+    benchmark.run_tests()
+    assert len(benchmark.results) == 3
+    for aggregate, value in zip(benchmark.results, [1, 2, 3]):
+        assert aggregate.input == value
+        assert [r.name for r in aggregate.results] == ['slow_wf', 'fast_wf']
+        assert [w.name for w in aggregate.workflows] == ['slow_wf', 'fast_wf']
+        assert [r.output for r in aggregate.results] == [value + 1, value * 2]
+
+
+def test_benchmark_workflow_schedule_installed_workflows():
+    def initializer(workflows):
+        return workflows + [Workflow('extra').add(lambda x: x)]
+
+    wf = Workflow('test_wf').add(lambda x: x + 1)
+    dataloader = Dataloader(dataset=MockDataset([1, 2, 3]), batch_size=2)
+    factory = DefaultAggregateFlowsFactory(hooks=[], initializer=initializer)
+    for workflows in ([], [wf]):
+        benchmark = Benchmark(dataloader=dataloader, workflows=workflows, flows_factory=factory, processes=2,
+                              schedule='workflow', progress=False)
+        with pytest.raises(ValueError):
+            benchmark.run_tests()
+
+
+def test_assemble():
+    parts = [(1, 1, AggregateFlows(2, workflows=[])), (0, 0, AggregateFlows(1, workflows=[])),
+             (1, 0, AggregateFlows(2, workflows=[])), (0, 1, AggregateFlows(1, workflows=[]))]
+    assert [index for index, _ in assemble(parts, 2)] == [1, 0]
+
+
+def test_benchmark_executors():
+    calls = []
+    wf1 = Workflow('test_wf_1').add(lambda x: x + 1)
+    wf2 = Workflow('test_wf_2').add(lambda x: x * 2)
+    factory = DefaultAggregateFlowsFactory(hooks=[lambda run: calls.append(run.final_output)])
+    dataset: Dataset = MockDataset([1, 2, 3, 4, 5])
+    benchmark = Benchmark(dataloader=Dataloader(dataset=dataset, batch_size=2), workflows=[wf1, wf2],
+                          flows_factory=factory, processes=2, executor='thread')
+    for executor, schedule in [(None, 'sample'), ('serial', 'sample'), ('thread', 'workflow'), ('process', 'sample')]:
+        benchmark.schedule = schedule
+        benchmark.results.clear()
+        benchmark.run_tests(executor=executor)
+        assert [r.results[0].output for r in benchmark.results] == [2, 3, 4, 5, 6]
+        assert [r.results[1].output for r in benchmark.results] == [2, 4, 6, 8, 10]
+    # hooks run in the calling process with the in-process executors
+    assert len(calls) == 3 * 5 * 2
+
+    benchmark.processes = None
+    benchmark.results.clear()
+    benchmark.run_tests(executor=SerialExecutor())
+    assert len(benchmark.results) == 5
+    with pytest.raises(ValueError):
+        benchmark.run_tests(executor='gpu')
@@ -0,0 +1,117 @@
+import subprocess
+import sys
+
+import numpy as np
+
+from octopipes.array_dataset import ArrayDataset
+from octopipes.cache import StepCache, hash_value, step_identity
+from octopipes.workflow import Workflow
+
+
+def test_hash_value():
+    assert hash_value(np.zeros((2, 2))) == hash_value(np.zeros((2, 2)))
+    assert hash_value(np.zeros((2, 2))) != hash_value(np.zeros((4,)))
+    assert hash_value(np.zeros((2, 2))) != hash_value(np.zeros((2, 2), dtype=np.int32))
+    assert hash_value([1, 'a', {'b': 2}]) == hash_value([1, 'a', {'b': 2}])
+    assert hash_value([1, 'a']) != hash_value((1, 'a'))
+    assert hash_value(1) != hash_value('1')
+
+
+def test_step_identity():
+    def make(value):
+        def process(x):
+            return x + value
+        return process
+
+    assert step_identity(make(1)) == step_identity(make(1))
+    assert step_identity(make(1)) != step_identity(make(2))
+    assert step_identity(lambda x: x + 1) != step_identity(lambda x: x + 2)
+    assert step_identity(lambda x, t=2: x * t) != step_identity(lambda x, t=3: x * t)
+    assert step_identity(lambda x, *, t=2: x * t) != step_identity(lambda x, *, t=3: x * t)
+
+
+class Model:
+    def __init__(self, scale):
+        self.scale = scale
+
+    def predict(self, x):
+        return x * self.scale
+
+
+def test_step_identity_bound_methods():
+    assert step_identity(Model(2).predict) == step_identity(Model(2).predict)
+    assert step_identity(Model(2).predict) != step_identity(Model(3).predict)
+
+    cache = StepCache()
+    outputs = [Workflow('wf').add(model.predict, cache=cache).compile()(5) for model in (Model(2), Model(3))]
+    assert outputs == [10, 15]
+
+
+def test_step_identity_across_runs():
+    # nested code objects and sets must not make the identity depend on addresses or on the hash seed
+    script = ("from octopipes.cache import step_identity\n"
+              "print(step_identity(lambda xs: [x for x in xs if x in {'a', 'b', 'c'}]))")
+    identities = {subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                 env={'PYTHONHASHSEED': seed, 'PYTHONPATH': '.'}).stdout
+                  for seed in ('1', '2')}
+    assert len(identities) == 1
+
+
+def test_hash_mapped_arrays(tmp_path):
+    np.save(tmp_path / 'a.npy', np.zeros((2, 3)))
+    before = hash_value(ArrayDataset(tmp_path / 'a.npy')[0])
+    np.save(tmp_path / 'a.npy', np.ones((2, 3)))
+    assert hash_value(ArrayDataset(tmp_path / 'a.npy')[0]) != before
+
+
+def test_step_cache_lru():
+    cache = StepCache(max_items=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert cache.get('c') == (True, 3)
+    assert cache.stats() == {'hits': 2, 'disk_hits': 0, 'misses': 1}
+
+
+def test_step_cache_disk(tmp_path):
+    cache = StepCache(max_items=1, directory=tmp_path, max_disk_bytes=600)
+    for i in range(5):
+        cache.put(f'key{i}', np.full(10, i))
+    assert sum(p.stat().st_size for p in tmp_path.glob('*.pkl')) <= 600
+
+    # a fresh cache (another process or run) reads the disk tier
+    other = StepCache(directory=tmp_path)
+    hit, value = other.get('key4')
+    assert hit
+    assert (value == 4).all()
+    assert other.get('key0') == (False, None)
+    assert other.stats() == {'hits': 0, 'disk_hits': 1, 'misses': 1}
+
+
+def test_workflow_cache():
+    calls = []
+
+    def embed(x):
+        calls.append(x)
+        return x * 2
+
+    cache = StepCache()
+    wf = Workflow('test_wf_1')\
+            .add(embed, cache=cache)\
+            .add(lambda x: (x + 1).tolist())
+
+    for _ in range(2):
+        wf_iter = wf(np.arange(3))
+        for _ in wf_iter:
+            pass
+        result = wf_iter.freeze()
+        assert result.output == [1, 3, 5]
+
+    assert len(calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert result.output_recap[0]['step'] == 'embed'
+    assert result.output_recap[0]['cached'] is True
+    assert result.output_recap[0]['duration'] >= 0
+    assert 'cached' not in result.output_recap[1]
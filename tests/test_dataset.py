@@ -75,3 +75,37 @@ def test_dataloader():
     assert next(batch_iter) == [4]
     with pytest.raises(StopIteration):
         next(batch_iter)
+
+
+@pytest.mark.parametrize('batch_size, limit, drop_last_batch', [
+    (2, None, False), (2, None, True), (3, 3, False), (3, 2, False), (3, 4, False), (1, None, False), (7, None, True),
+])
+def test_dataloader_prefetch(batch_size, limit, drop_last_batch):
+    dataset: Dataset = MockDataset([1, 2, 3, 4, 5])
+    expected = list(Dataloader(dataset=dataset, batch_size=batch_size, limit=limit, drop_last_batch=drop_last_batch))
+    dataloader = Dataloader(dataset=dataset, batch_size=batch_size, limit=limit, drop_last_batch=drop_last_batch,
+                            prefetch=2, prefetch_workers=2)
+    assert list(dataloader) == expected
+    assert dataloader.stats.batches == len(expected)
+    assert 0 <= dataloader.stats.mean_depth <= 2
+    # the loader can be iterated again
+    assert list(dataloader) == expected
+
+
+def test_dataloader_prefetch_loads_ahead():
+    loaded = []
+
+    class RecordingDataset(MockDataset):
+        def __getitem__(self, index):
+            loaded.append(index.start)
+            return super().__getitem__(index)
+
+    dataloader = Dataloader(dataset=RecordingDataset(list(range(10))), batch_size=2, prefetch=3)
+    batch_iter = iter(dataloader)
+    assert next(batch_iter) == [0, 1]
+    # the next batches were queued before being requested
+    assert len(batch_iter.futures) == 3
+    assert [next(batch_iter) for _ in range(4)] == [[2, 3], [4, 5], [6, 7], [8, 9]]
+    with pytest.raises(StopIteration):
+        next(batch_iter)
+    assert sorted(loaded) == [0, 2, 4, 6, 8]
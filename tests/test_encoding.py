@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+
+from octopipes.encoding import decode, decode_array, encode, encode_array, rle_decode, rle_encode
+
+
+def test_encode_array():
+    for array in [np.arange(12, dtype=np.int64).reshape(3, 4),
+                  np.linspace(0, 1, 5, dtype='>f4'),
+                  np.zeros((0, 4), dtype=np.uint8)]:
+        decoded = decode_array(json.loads(json.dumps(encode_array(array))))
+        assert decoded.shape == array.shape
+        assert (decoded == array).all()
+    assert encode_array(np.zeros(2, dtype='>f4'))['dtype'] == '<f4'
+
+
+def test_rle():
+    mask = np.zeros((64, 64), dtype=bool)
+    mask[10:20, 5:30] = True
+    encoded = rle_encode(mask)
+    assert len(json.dumps(encoded)) * 50 < len(json.dumps(mask.tolist()))
+    assert (rle_decode(encoded) == mask).all()
+
+    for mask in [np.ones((3, 3), dtype=bool), np.zeros((2, 5), dtype=bool),
+                 np.zeros((0,), dtype=bool), np.random.rand(4, 16, 16) > 0.5]:
+        decoded = rle_decode(json.loads(json.dumps(rle_encode(mask))))
+        assert decoded.shape == mask.shape
+        assert (decoded == mask).all()
+
+
+def test_encode():
+    value = {'masks': [{'segmentation': np.eye(3, dtype=bool), 'area': np.int64(3)}], 'scores': np.ones(2)}
+    encoded = json.loads(json.dumps(encode(value)))
+    assert encoded['masks'][0]['segmentation']['encoding'] == 'rle'
+    assert encoded['masks'][0]['area'] == 3
+
+    decoded = decode(encoded)
+    assert (decoded['masks'][0]['segmentation'] == np.eye(3, dtype=bool)).all()
+    assert (decoded['scores'] == np.ones(2)).all()
+    assert decode(encode([1, 'a', None])) == [1, 'a', None]
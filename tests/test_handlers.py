@@ -1,6 +1,6 @@
 import numpy as np
 
-from octopipes.handlers import BboxesHandler, CirclesHandler, CmapBboxesHandler, DefaultHandler
+from octopipes.handlers import BboxesHandler, CirclesHandler, CmapBboxesHandler, DefaultHandler, SegmentationMasksHandler
 
 
 def test_DefaultHandler():
@@ -55,3 +55,23 @@ def test_CmapBboxesHandler():
     assert handler.to_json([]) == '{"bboxes": [], "len_output": 0}'
     assert handler.to_json(None) == '{"bboxes": null, "len_output": 0}'
 
+
+
+def test_compact():
+    masks = np.random.rand(3, 32, 32) > 0.5
+    handler = SegmentationMasksHandler()
+    compact = handler.to_compact(masks)
+    assert compact['len_output'] == 3
+    assert (handler.from_compact(compact) == masks).all()
+
+    for handler, output in [(BboxesHandler(), np.array([[0, 0, 10, 10], [1, 2, 3, 4]])),
+                            (CirclesHandler(), np.array([[0, 0, 10], [10, 7, 5]])),
+                            (DefaultHandler(), np.arange(4))]:
+        assert (handler.from_compact(handler.to_compact(output)) == output).all()
+    assert BboxesHandler().from_compact(BboxesHandler().to_compact(None)) is None
+
+    handler = CmapBboxesHandler()
+    decoded = handler.from_compact(handler.to_compact([([0, 0, 10, 10], 1), ([0, 0, 5, 5], 2)]))
+    assert [(bbox.tolist(), value) for bbox, value in decoded] == [([0, 0, 10, 10], 1), ([0, 0, 5, 5], 2)]
+    assert handler.from_compact(handler.to_compact(None)) is None
+    assert handler.from_compact(handler.to_compact([])) == []
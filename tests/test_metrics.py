@@ -0,0 +1,129 @@
+import math
+
+import numpy as np
+import pytest
+
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.handlers import BboxesHandler, CirclesHandler, DefaultHandler, SegmentationMasksHandler
+from octopipes.metrics import DetectionMetrics, box_iou, circle_iou, mask_iou, match, metrics_for
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def test_box_iou():
+    boxes = [[0, 0, 10, 10], [5, 5, 15, 15]]
+    others = [[0, 0, 10, 10], [0, 0, 5, 5], [20, 20, 30, 30]]
+    iou = box_iou(boxes, others)
+    assert iou.shape == (2, 3)
+    assert iou[0] == pytest.approx([1, 0.25, 0])
+    assert iou[1] == pytest.approx([25 / 175, 0, 0])
+    assert box_iou([], others).shape == (0, 3)
+
+
+def test_circle_iou():
+    iou = circle_iou([(0, 0, 1), (0, 0, 2)], [(0, 0, 1), (5, 0, 1), (1, 0, 1)])
+    assert iou[0, :2] == pytest.approx([1, 0])
+    # a circle inside another one
+    assert iou[1, 0] == pytest.approx(0.25)
+    # two unit circles one radius apart: the lens is 2π/3 - √3/2
+    lens = 2 * math.pi / 3 - math.sqrt(3) / 2
+    assert iou[0, 2] == pytest.approx(lens / (2 * math.pi - lens))
+
+
+def test_mask_iou():
+    masks = np.zeros((2, 4, 4), dtype=bool)
+    masks[0, :2] = True
+    masks[1, :, :2] = True
+    iou = mask_iou(masks, masks[:1])
+    assert iou[:, 0] == pytest.approx([1, 4 / 12])
+    assert mask_iou(masks[:0], masks).shape == (0, 2)
+
+
+def test_match():
+    iou = np.array([[0.9, 0.6], [0.8, 0.6], [0.55, 0.]])
+    true_positives = match(iou, np.array([0.5, 0.7]))
+    # the first prediction takes the best ground truth, the second the remaining one if it is good enough
+    assert true_positives.tolist() == [[True, True, False], [True, False, False]]
+
+
+def test_detection_metrics():
+    metrics = DetectionMetrics('bbox', thresholds=[0.5])
+    # one perfect match and a false positive with a lower score
+    metrics.update([[0, 0, 10, 10, 0.9], [50, 50, 60, 60, 0.2]], [[0, 0, 10, 10]])
+    # a missed ground truth
+    metrics.update(np.zeros((0, 4)), [[0, 0, 10, 10]])
+    result = metrics.compute()
+    assert result['samples'] == 2
+    assert result['predictions'] == 2
+    assert result['ground_truths'] == 2
+    assert result['precision'] == 0.5
+    assert result['recall'] == 0.5
+    # the precision is 1 up to a recall of 0.5
+    assert result['map'] == pytest.approx(51 / 101)
+
+    other = DetectionMetrics('bbox', thresholds=[0.5])
+    other.update([[0, 0, 10, 10]], [[0, 0, 10, 10]])
+    assert metrics.merge(other).compute()['recall'] == pytest.approx(2 / 3)
+
+    perfect = DetectionMetrics('circle')
+    perfect.update([(5, 5, 2)], [(5, 5, 2)])
+    assert perfect.compute()['map'] == pytest.approx(1)
+    assert math.isnan(DetectionMetrics().compute()['map'])
+    with pytest.raises(ValueError):
+        DetectionMetrics('keypoints')
+
+
+def test_mask_annotations():
+    masks = np.zeros((2, 4, 4), dtype=bool)
+    masks[0, :2] = True
+    masks[1, 2:] = True
+    metrics = DetectionMetrics('mask', thresholds=[0.5])
+    metrics.update([{'segmentation': masks[1], 'area': 8, 'score': 0.9}], masks)
+    result = metrics.compute()
+    assert (result['precision'], result['recall']) == (1, 0.5)
+
+
+def test_metrics_for():
+    assert metrics_for(BboxesHandler()).kind == 'bbox'
+    assert metrics_for(CirclesHandler()).kind == 'circle'
+    assert metrics_for(SegmentationMasksHandler()).kind == 'mask'
+    assert metrics_for(DefaultHandler()) is None
+
+
+def test_benchmark_metrics():
+    boxes = [[0, 0, 10, 10], [20, 20, 30, 30]]
+    dataset = MockDataset([(np.array(box), [box]) for box in boxes])
+    exact = Workflow('exact').add(lambda x: [x.tolist()], BboxesHandler())
+    shifted = Workflow('shifted').add(lambda x: [(x + 5).tolist()], BboxesHandler())
+    plain = Workflow('plain').add(lambda x: x.tolist())
+    benchmark = Benchmark(dataloader=Dataloader(dataset=dataset, batch_size=2), workflows=[exact, shifted, plain],
+                          processes=2, schedule='workflow', metrics=True)
+    benchmark.run_tests()
+    assert [aggregate.ground_truth for aggregate in benchmark.results] == [[box] for box in boxes]
+    evaluation = benchmark.evaluate()
+    assert set(evaluation) == {'exact', 'shifted'}
+    assert evaluation['exact']['samples'] == 2
+    assert evaluation['exact']['map'] == pytest.approx(1)
+    assert evaluation['shifted']['recall'] == 0
+    assert evaluation['shifted']['mean_iou'] == pytest.approx(25 / 175)
+
+    with pytest.raises(ValueError):
+        Benchmark(dataloader=Dataloader(dataset=dataset), workflows=[exact]).evaluate()
+
+
+def test_benchmark_metrics_ground_truth():
+    dataset = MockDataset([(np.array(box), [box]) for box in [[0, 0, 10, 10], [20, 20, 30, 30]]])
+    boxes = Workflow('boxes').add(lambda x: [x.tolist()], BboxesHandler())
+    masks = Workflow('masks').add(lambda x: np.ones((1, 4, 4), dtype=bool), SegmentationMasksHandler())
+    benchmark = Benchmark(dataloader=Dataloader(dataset=dataset), workflows=[boxes, masks], processes=2)
+    benchmark.run_tests()
+    assert [aggregate.ground_truth for aggregate in benchmark.results] == [None, None]
+
+    # the boxes do not fit the masks workflow, which is skipped
+    benchmark = Benchmark(dataloader=Dataloader(dataset=dataset), workflows=[boxes, masks], processes=2, metrics=True)
+    benchmark.run_tests()
+    assert benchmark.results[0].ground_truth == [[0, 0, 10, 10]]
+    assert set(benchmark.evaluate()) == {'boxes', 'masks'}
+    assert benchmark.evaluate()['boxes']['map'] == pytest.approx(1)
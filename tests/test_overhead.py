@@ -0,0 +1,22 @@
+from benchmarks import overhead
+
+
+def test_compare():
+    baseline = {'a': {'ns': 100., 'unit': 'step'}, 'b': {'ns': 100., 'unit': 'step'}}
+    results = {'a': {'ns': 115., 'unit': 'step'}, 'b': {'ns': 130., 'unit': 'step'}, 'new': {'ns': 1., 'unit': 'call'}}
+    regressions = overhead.compare(results, baseline, threshold=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith('b: 130.0 ns/step is 1.30x')
+
+
+def test_run_and_save(tmp_path):
+    path = tmp_path / 'baseline.json'
+    assert overhead.main(['-k', 'compile_requires', '--repeat', '1', '--baseline', str(path)]) == 0
+    assert overhead.main(['-k', 'compile_requires', '--repeat', '1', '--baseline', str(path), '--save']) == 0
+    baseline = overhead.load(path)
+    assert list(baseline) == ['compile_requires']
+    assert baseline['compile_requires']['ns'] > 0
+    # a baseline ten times faster is a regression
+    baseline['compile_requires']['ns'] /= 10
+    overhead.save(baseline, path)
+    assert overhead.main(['-k', 'compile_requires', '--repeat', '1', '--baseline', str(path)]) == 1
@@ -0,0 +1,64 @@
+import queue
+
+import pytest
+
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.progress import ProgressMonitor, ProgressReporter
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def test_reporter_rate_limit():
+    channel = queue.Queue()
+    reporter = ProgressReporter(channel, interval=3600)
+    for _ in range(10):
+        reporter.sample_started()
+        for _ in reporter.track_steps(range(3)):
+            pass
+        reporter.sample_done()
+    # nothing is sent before the interval
+    assert channel.empty()
+    reporter.flush()
+    assert channel.get_nowait() == (10, 10, 30)
+    reporter.flush()
+    assert channel.empty()
+
+    reporter = ProgressReporter(channel, interval=0)
+    reporter.sample_started()
+    assert channel.get_nowait() == (1, 0, 0)
+
+
+def test_monitor():
+    with ProgressMonitor(total=2, display=False) as monitor:
+        reporter = monitor.reporter()
+        reporter.sample_started()
+        reporter.add_steps(4)
+        monitor.collected()
+    stats = monitor.stats()
+    assert stats['samples'] == 1 and stats['steps'] == 4 and stats['in_flight'] == 1
+
+
+@pytest.mark.parametrize('executor, schedule', [('process', 'sample'), ('process', 'workflow'), ('thread', 'sample')])
+def test_benchmark_progress(executor, schedule):
+    wf1 = Workflow('wf1').add(lambda x: x + 1).add(lambda x: x * 2)
+    wf2 = Workflow('wf2').add(lambda x: x - 1)
+    dataloader = Dataloader(MockDataset([1, 2, 3, 4, 5]), batch_size=2)
+    benchmark = Benchmark(dataloader, [wf1, wf2], processes=2, executor=executor, schedule=schedule)
+    benchmark.run_tests()
+    stats = benchmark.monitor.stats()
+    assert stats['samples'] == 5
+    assert stats['steps'] == 5 * 3
+    assert stats['in_flight'] == 0
+    # the reporters are not sent back with the results
+    assert all(aggregate.reporter is None for aggregate in benchmark.results)
+
+
+def test_benchmark_progress_disabled():
+    dataloader = Dataloader(MockDataset([1, 2, 3]), batch_size=2)
+    benchmark = Benchmark(dataloader, [Workflow('wf').add(lambda x: x + 1)], progress=False)
+    benchmark.run_tests()
+    assert benchmark.monitor is None
+    assert [aggregate.results[0].output for aggregate in benchmark.results] == [2, 3, 4]
+    assert not benchmark.results[0].progress
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+from octopipes.handlers import BboxesHandler, CmapBboxesHandler, SegmentationMasksHandler
+from octopipes.rendering import colormap_colors, draw_bboxes, label_map, palette, render_batch
+
+
+def test_palette():
+    assert palette(3).shape == (3, 3)
+    assert (palette(3) == palette(300)[:3]).all()
+
+
+def test_colormap_colors():
+    import cmap
+
+    values = np.array([1.0, 2.0, 5.0])
+    exact = np.array(255 * cmap.Colormap('viridis')((values - 1) / 4)[:, :3], dtype=int)
+    assert np.abs(colormap_colors(values).astype(int) - exact).max() <= 1
+    assert (colormap_colors([3, 3]) == colormap_colors([0, 1])[0]).all()
+
+
+def test_label_map():
+    masks = np.zeros((3, 4, 4), dtype=bool)
+    masks[0, :2] = True
+    masks[1, 1:3] = True
+    labels = label_map(list(masks))
+    assert labels[:, 0].tolist() == [0, 1, 1, -1]
+    assert labels.dtype == np.int16
+
+    # same labels as assigning the masks one after the other
+    masks = np.random.default_rng(0).random((5, 8, 8)) < 0.3
+    expected = np.full((8, 8), -1)
+    for index, mask in enumerate(masks):
+        expected[mask] = index
+    assert (label_map(masks) == expected).all()
+    assert (label_map([], shape=(2, 3)) == -1).all()
+
+
+def test_draw_bboxes():
+    bboxes = [[1, 2, 10, 12], [5, 5, 30, 20]]
+    expected = np.zeros((32, 32, 3), dtype=np.uint8)
+    for bbox in bboxes:
+        cv2.rectangle(expected, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (10, 20, 30), 3)
+
+    image = draw_bboxes(np.zeros((32, 32, 3), dtype=np.uint8), bboxes, (10, 20, 30))
+    assert (image == expected).all()
+
+
+def test_segmentation_output_on_image():
+    image = np.full((16, 16, 3), 100, dtype=np.uint8)
+    big = np.zeros((16, 16), dtype=bool)
+    big[:8] = True
+    small = np.zeros((16, 16), dtype=bool)
+    small[4:6] = True
+    anns = [{'segmentation': small, 'area': small.sum()}, {'segmentation': big, 'area': big.sum()}]
+
+    # same drawing as assigning the masks by decreasing area
+    colors = palette(2)
+    overlay = np.zeros((16, 16, 3), dtype=np.uint8)
+    overlay[big] = colors[0]
+    overlay[small] = colors[1]
+    expected = cv2.addWeighted(image, 1, overlay, 0.3, 20)
+
+    handler = SegmentationMasksHandler()
+    assert (handler.output_on_image(image, anns) == expected).all()
+    assert (handler.output_on_image(image, anns) == handler.output_on_image(image, anns)).all()
+    assert (handler.output_on_image(image, np.stack([big, small])) == expected).all()
+
+
+def test_render_batch():
+    images = [np.zeros((16, 16, 3), dtype=np.uint8) for _ in range(2)]
+    outputs = [[[0, 0, 5, 5]], [[2, 2, 8, 8]]]
+    rendered = render_batch(BboxesHandler(color=(255, 0, 0)), images, outputs)
+    assert len(rendered) == 2
+    assert rendered[0][0, 0].tolist() == [255, 0, 0]
+    assert images[0].sum() == 0
+
+    rendered = render_batch(CmapBboxesHandler(), images, [[(1, [0, 0, 5, 5]), (2, [2, 2, 8, 8])]] * 2)
+    assert rendered[0].sum() > 0
+
+    stacked = np.stack(images)
+    rendered = render_batch(BboxesHandler(color=(255, 0, 0)), stacked, outputs)
+    assert rendered[1][2, 2].tolist() == [255, 0, 0]
+    assert stacked.sum() == 0
@@ -0,0 +1,49 @@
+import pickle
+
+from octopipes.aggregate_flows import AggregateFlows
+from octopipes.handlers import BboxesHandler
+from octopipes.results import LazyResults, Results
+from octopipes.workflow import Workflow
+
+
+class CountingHandler(BboxesHandler):
+    calls = 0
+
+    def to_json(self, output) -> str:
+        CountingHandler.calls += 1
+        return super().to_json(output)
+
+
+def test_lazy_results():
+    wf = Workflow('test_wf_1', metadata={'thresh': 0.5})\
+            .add(lambda x: x + 1)\
+            .add(lambda x: [[0, 0, x, x]], CountingHandler())
+    wf_iter = wf(1)
+    for _ in wf_iter:
+        pass
+
+    lazy = wf_iter.freeze(lazy=True)
+    assert isinstance(lazy, LazyResults)
+    assert lazy.output == [[0, 0, 2, 2]]
+    assert lazy.total_duration == wf_iter.total_duration
+    assert CountingHandler.calls == 0
+
+    assert lazy.json_output == '{"bboxes": [{"bbox": [0, 0, 2, 2]}], "len_output": 1}'
+    assert lazy.json_output == '{"bboxes": [{"bbox": [0, 0, 2, 2]}], "len_output": 1}'
+    assert CountingHandler.calls == 1
+    assert lazy.len_output == 1
+
+    results = lazy.to_results()
+    assert isinstance(results, Results)
+    assert results == wf_iter.freeze()
+    assert pickle.loads(pickle.dumps(lazy)).json_output == lazy.json_output
+
+
+def test_aggregateflows_lazy():
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)
+    flows = AggregateFlows(2, workflows=[wf], lazy=True)
+    flows.run_workflows()
+    assert isinstance(flows.results[0], LazyResults)
+    assert flows.results[0].output == 3
+    assert flows.results[0].output_recap[0]['step'] == '<lambda>'
@@ -0,0 +1,121 @@
+import importlib.util
+
+import numpy as np
+import pytest
+
+from octopipes.aggregate_flows import AggregateFlows
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader, Dataset
+from octopipes.handlers import BboxesHandler
+from octopipes.sinks import JsonlResultsSink, ParquetResultsSink, read_results
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def test_jsonl_sink_benchmark(tmp_path):
+    wf1 = Workflow('test_wf_1', metadata={'thresh': 0.5})\
+            .add(lambda x: [[0, 0, x, x]], BboxesHandler())
+    wf2 = Workflow('test_wf_2')\
+            .add(lambda x: x * 2)
+    dataset: Dataset = MockDataset([1, 2, 3])
+    dataloader = Dataloader(dataset=dataset, batch_size=2)
+    path = tmp_path / 'results.jsonl'
+    benchmark = Benchmark(dataloader=dataloader, workflows=[wf1, wf2], processes=2,
+                          sink=JsonlResultsSink(path), window=1)
+    benchmark.run_tests()
+    assert len(benchmark.results) == 1
+    assert benchmark.results[0].input == 3
+
+    records = list(read_results(path))
+    assert [index for index, _ in records] == [0, 0, 1, 1, 2, 2]
+    assert [r.name for _, r in records] == ['test_wf_1', 'test_wf_2'] * 3
+    assert records[2][1].json_output == '{"bboxes": [{"bbox": [0, 0, 2, 2]}], "len_output": 1}'
+    assert records[2][1].metadata == {'thresh': 0.5}
+    assert records[3][1].json_output == '4'
+    assert records[3][1].output is None
+    assert records[3][1].output_recap[0]['step'] == '<lambda>'
+
+
+def test_parquet_sink(tmp_path):
+    pytest.importorskip('pyarrow')
+
+    wf = Workflow('test_wf_1', metadata={'thresh': 0.5})\
+            .add(lambda x: x + 1)
+    path = tmp_path / 'results.parquet'
+    with ParquetResultsSink(path, row_group_size=2) as sink:
+        for index in range(5):
+            flows = AggregateFlows(index, workflows=[wf])
+            flows.run_workflows()
+            sink.write(index, flows)
+
+    records = list(read_results(path, batch_size=2))
+    assert [index for index, _ in records] == [0, 1, 2, 3, 4]
+    assert [r.json_output for _, r in records] == ['1', '2', '3', '4', '5']
+    assert records[0][1].metadata == {'thresh': 0.5}
+    assert records[0][1].output_recap[0]['duration'] >= 0
+
+
+def test_compact_sink(tmp_path):
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: np.full((x, 4), x), BboxesHandler())
+    paths = [tmp_path / 'results.jsonl']
+    if importlib.util.find_spec('pyarrow') is not None:
+        paths.append(tmp_path / 'results.parquet')
+
+    for path in paths:
+        sink = JsonlResultsSink(path, compact=True) if path.suffix == '.jsonl' else ParquetResultsSink(path, compact=True)
+        with sink:
+            for index in range(1, 3):
+                flows = AggregateFlows(index, workflows=[wf], lazy=True)
+                flows.run_workflows()
+                sink.write(index, flows)
+
+        records = list(read_results(path))
+        assert [r.json_output for _, r in records] == ['', '']
+        bboxes = BboxesHandler().from_compact(records[1][1].compact_output)
+        assert (bboxes == np.full((2, 4), 2)).all()
+
+    with pytest.raises(ValueError):
+        flows = AggregateFlows(1, workflows=[wf])
+        flows.run_workflows()
+        JsonlResultsSink(tmp_path / 'other.jsonl', compact=True).write(0, flows)
+
+
+def test_compact_sink_eager(tmp_path):
+    wf_none = Workflow('test_wf_none')\
+            .add(lambda x: None)
+    wf_bboxes = Workflow('test_wf_bboxes')\
+            .add(lambda x: np.full((x, 4), x), BboxesHandler())
+    path = tmp_path / 'results.jsonl'
+    with JsonlResultsSink(path, compact=True) as sink:
+        for lazy in (True, False):
+            flows = AggregateFlows(2, workflows=[wf_none, wf_bboxes], lazy=lazy, compact=not lazy)
+            flows.run_workflows()
+            sink.write(int(lazy), flows)
+
+    records = list(read_results(path))
+    assert [r.compact_output for _, r in records[::2]] == [None, None]
+    for _, record in records[1::2]:
+        assert (BboxesHandler().from_compact(record.compact_output) == np.full((2, 4), 2)).all()
+
+
+@pytest.mark.parametrize('suffix', ['jsonl', 'parquet'])
+def test_sink_instrumentation(tmp_path, suffix):
+    if suffix == 'parquet':
+        pytest.importorskip('pyarrow')
+    from octopipes.hooks.instrumentation import instrument
+
+    wf = instrument(Workflow('test_wf_1').add(lambda x: np.zeros(x)).add(len), peak_memory=True)
+    path = tmp_path / f'results.{suffix}'
+    sink = ParquetResultsSink(path) if suffix == 'parquet' else JsonlResultsSink(path)
+    with sink:
+        flows = AggregateFlows(100, workflows=[wf])
+        flows.run_workflows()
+        sink.write(0, flows)
+
+    [(_, result)] = list(read_results(path))
+    first, second = result.output_recap
+    assert first['output_bytes'] == 800
+    assert set(first) == {'step', 'duration', 'cpu_time', 'peak_memory', 'rss_delta', 'output_bytes'}
+    assert second['output_bytes'] > 0
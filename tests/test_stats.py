@@ -0,0 +1,89 @@
+import math
+import random
+
+import pytest
+
+from octopipes.aggregate_flows import AggregateFlows
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.stats import TOTAL, Histogram, LatencyStats, QuantileSketch
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def test_quantile_sketch_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(-5, 1.5) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    values.sort()
+    for q in (0.01, 0.5, 0.9, 0.95, 0.99, 1):
+        exact = values[round(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert sketch.count == len(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+    # the buckets grow with the logarithm of the range of the values, not their number
+    assert len(sketch.buckets) < 2000
+    assert math.isnan(QuantileSketch().quantile(0.5))
+
+
+def test_quantile_sketch_merge_and_bound():
+    first, second, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for value in range(1, 1001):
+        (first if value % 2 else second).add(value / 1000)
+        both.add(value / 1000)
+    first.merge(second)
+    assert first.buckets == both.buckets
+    assert first.quantile(0.95) == both.quantile(0.95)
+
+    bounded = QuantileSketch(max_buckets=10)
+    for value in range(1, 1001):
+        bounded.add(value)
+    assert len(bounded.buckets) == 10
+    assert bounded.quantile(0.99) == pytest.approx(990, rel=0.02)
+    # the lowest quantiles lose their accuracy, not the extremes
+    assert bounded.min == 1 and bounded.quantile(1) == 1000
+
+
+def test_histogram():
+    histogram = Histogram(edges=(1, 10, 100))
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.add(value)
+    assert histogram.counts == [1, 2, 1, 1]
+    assert histogram.merge(histogram).counts == [2, 4, 2, 2]
+
+
+def test_latency_stats():
+    def slow(x):
+        return x + 1
+
+    wf = Workflow('wf', metadata={'size': 2}).add(slow).add(lambda x: x * 2)
+    stats = LatencyStats()
+    flows = AggregateFlows(1, workflows=[wf], lazy=True)
+    flows.add_hook(stats)
+    flows.run_workflows()
+    stats.observe(flows)
+    stats.observe_result(flows.results[0].to_results())
+
+    assert set(stats.stats) == {('wf(size:2)', 'slow'), ('wf(size:2)', '<lambda>'), ('wf(size:2)', TOTAL)}
+    assert all(entry.count == 3 for entry in stats.stats.values())
+
+    merged = LatencyStats().merge(stats).merge(stats)
+    assert merged.stats['wf(size:2)', TOTAL].count == 6
+    rows = merged.summary()
+    assert {'workflow', 'step', 'count', 'mean', 'p50', 'p95', 'p99', 'throughput'} <= set(rows[0])
+    assert 'wf(size:2)' in merged.table()
+
+
+def test_benchmark_stats(capsys):
+    wf1 = Workflow('wf1').add(lambda x: x + 1)
+    wf2 = Workflow('wf2').add(lambda x: x * 2).add(lambda x: x - 1)
+    stats = LatencyStats()
+    benchmark = Benchmark(Dataloader(MockDataset(list(range(10))), batch_size=4), [wf1, wf2], processes=2,
+                          stats=stats)
+    benchmark.run_tests()
+    assert stats.stats['wf1', TOTAL].count == 10
+    assert stats.stats['wf2', TOTAL].count == 10
+    assert 'p95' in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import json
+import os
+
+from octopipes.aggregate_flows import DefaultAggregateFlowsFactory
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.tracing import Tracer, tracer
+from octopipes.transport import SharedMemoryTransport
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def test_tracer(tmp_path):
+    local = Tracer()
+    with local.span('ignored', 'test'):
+        pass
+    assert local.events == []
+
+    local.enable('main')
+    with local.span('outer', 'test', {'size': 2}):
+        local.complete('inner', 'test', 1., 1.5)
+    path = tmp_path / 'trace.json'
+    local.save(path)
+    with open(path) as file:
+        events = json.load(file)['traceEvents']
+    assert events[0] == {'ph': 'M', 'name': 'process_name', 'pid': os.getpid(), 'tid': 0, 'args': {'name': 'main'}}
+    assert events[1]['name'] == 'thread_name'
+    inner, outer = events[2:]
+    assert (inner['ts'], inner['dur'], inner['cat']) == (1e6, 0.5e6, 'test')
+    assert outer['args'] == {'size': 2}
+    assert outer['dur'] >= 0
+
+    assert len(local.drain()) == 4
+    assert local.events == []
+
+
+def test_workflow_tracing():
+    wf = Workflow('wf').add(lambda x: x + 1).add(lambda x: x * 2)
+    tracer.enable()
+    try:
+        run = wf(1)
+        for _ in run:
+            pass
+        run.freeze()
+        events = [event for event in tracer.drain() if event[0] == 'X']
+    finally:
+        tracer.disable()
+        tracer.reset()
+    assert [(event[1], event[2]) for event in events] == [('<lambda>', 'step'), ('<lambda>', 'step'), ('freeze', 'freeze')]
+    assert all(event[7]['workflow'] == 'wf' for event in events)
+
+
+def test_benchmark_trace(tmp_path):
+    def hook(run):
+        pass
+
+    wf1 = Workflow('wf1').add(lambda x: x + 1)
+    wf2 = Workflow('wf2').add(lambda x: x * 2)
+    dataset = MockDataset([1, 2, 3, 4, 5, 6])
+    path = tmp_path / 'trace.json'
+    benchmark = Benchmark(dataloader=Dataloader(dataset=dataset, batch_size=2), workflows=[wf1, wf2],
+                          flows_factory=DefaultAggregateFlowsFactory(hooks=[hook]), processes=2,
+                          transport=SharedMemoryTransport(), progress=False, trace=path)
+    benchmark.run_tests()
+    assert [r.results[1].output for r in benchmark.results] == [2, 4, 6, 8, 10, 12]
+    assert all(r.trace is None for r in benchmark.results)
+    assert not tracer.enabled and tracer.events == []
+
+    with open(path) as file:
+        events = json.load(file)['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    names = {event['args']['name'] for event in events if event['name'] == 'process_name'}
+    assert names == {'benchmark', 'worker'}
+    categories = {event['cat'] for event in spans}
+    assert {'dataloader', 'transport', 'benchmark', 'step', 'freeze', 'hook'} <= categories
+    assert len([event for event in spans if event['cat'] == 'step']) == 12
+    assert len([event for event in spans if event['cat'] == 'dataloader']) == 4
+    # the steps run in the workers
+    assert all(event['pid'] != os.getpid() for event in spans if event['cat'] == 'step')
+
+    benchmark.schedule = 'workflow'
+    benchmark.results.clear()
+    benchmark.run_tests(executor='thread')
+    with open(path) as file:
+        spans = [event for event in json.load(file)['traceEvents'] if event['ph'] == 'X']
+    assert len([event for event in spans if event['cat'] == 'step']) == 12
+    assert all(event['pid'] == os.getpid() for event in spans)
@@ -0,0 +1,147 @@
+import gc
+import os
+import pathlib
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from octopipes import transport
+from octopipes.aggregate_flows import DefaultAggregateFlowsFactory
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.transport import Packed, SharedMemoryTransport
+from octopipes.workflow import Workflow
+
+from tests.test_dataset import MockDataset
+
+
+def segments() -> set[str]:
+    return {path.name for path in pathlib.Path('/dev/shm').glob('octopipes_*')}
+
+
+pytestmark = pytest.mark.skipif(not os.path.isdir('/dev/shm'), reason='requires posix shared memory')
+
+
+def test_pack_unpack():
+    shared = SharedMemoryTransport(min_bytes=1024)
+    value = {'mask': np.ones((64, 64), dtype=bool), 'small': np.arange(3), 'fn': lambda x: x + 1,
+             'readonly': np.arange(1000.)}
+    value['readonly'].flags.writeable = False
+    packed = shared.pack(value)
+    assert isinstance(packed, Packed)
+    assert packed.nbytes == 64 * 64 + 8000
+    assert len(packed.data) < 1024
+    assert packed.segment in segments()
+
+    unpacked = shared.unpack(packed)
+    # the segment is unlinked as soon as it is received
+    assert packed.segment not in segments()
+    np.testing.assert_array_equal(unpacked['mask'], value['mask'])
+    np.testing.assert_array_equal(unpacked['small'], value['small'])
+    assert unpacked['fn'](1) == 2
+    assert not unpacked['readonly'].flags.writeable
+    assert unpacked['mask'].flags.writeable
+
+
+def test_small_values_are_pickled():
+    shared = SharedMemoryTransport()
+    packed = shared.pack([1, np.arange(3)])
+    assert packed.segment is None
+    assert shared.unpack(packed)[0] == 1
+    assert shared.unpack('not packed') == 'not packed'
+
+
+def test_segment_lifetime(monkeypatch):
+    closed = []
+
+    class Segment(transport._received_segment_class()):
+        def close(self):
+            super().close()
+            closed.append(self.name)
+
+    monkeypatch.setattr(transport, '_received_segment_class', lambda: Segment)
+    shared = SharedMemoryTransport(min_bytes=1024)
+    unpacked = shared.unpack(shared.pack([np.zeros(1000), np.ones(1000)]))
+    view = unpacked[1].reshape(10, 100)
+    del unpacked
+    gc.collect()
+    # the second array is still referenced by a view, the segment stays open
+    assert view.sum() == 1000
+    assert closed == []
+
+    del view
+    gc.collect()
+    assert len(closed) == 1
+
+
+def test_no_errors_at_exit():
+    # arrays still alive at exit do not make the segments fail to close
+    script = ("import numpy as np\n"
+              "from octopipes.transport import SharedMemoryTransport\n"
+              "shared = SharedMemoryTransport(min_bytes=1024)\n"
+              "kept = [shared.unpack(shared.pack(np.zeros(1000))) for _ in range(3)]\n")
+    process = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, env={'PYTHONPATH': '.'})
+    assert process.returncode == 0
+    assert process.stderr == ''
+
+
+def test_benchmark_shared_memory():
+    dataset = MockDataset([np.full((128, 128), i, dtype=np.float32) for i in range(5)])
+    workflow = Workflow('double').add(lambda x: x * 2)
+    before = segments()
+    for schedule, processes in [('sample', 2), ('workflow', 2), ('sample', None)]:
+        bench = Benchmark(Dataloader(dataset, batch_size=2), [workflow], processes=processes, schedule=schedule,
+                          flows_factory=DefaultAggregateFlowsFactory(hooks=[], lazy=True),
+                          transport=SharedMemoryTransport(min_bytes=1024))
+        bench.run_tests()
+        for i, aggregate in enumerate(bench.results):
+            np.testing.assert_array_equal(aggregate.results[0].output, np.full((128, 128), 2 * i))
+    assert segments() == before
+
+
+def fail_on_last(x):
+    if x[0, 0] == 7:
+        raise RuntimeError('failed sample')
+    return x * 2
+
+
+def test_benchmark_failure_releases_segments():
+    dataset = MockDataset([np.full((128, 128), i, dtype=np.float32) for i in range(8)])
+    workflow = Workflow('fail').add(fail_on_last)
+    before = segments()
+    for schedule in ('sample', 'workflow'):
+        shared = SharedMemoryTransport(min_bytes=1024)
+        bench = Benchmark(Dataloader(dataset, batch_size=1), [workflow], processes=2, schedule=schedule,
+                          flows_factory=DefaultAggregateFlowsFactory(hooks=[], lazy=True), progress=False,
+                          transport=shared)
+        with pytest.raises(RuntimeError):
+            bench.run_tests()
+        assert not any(name.startswith(shared.prefix) for name in segments())
+    assert segments() == before
+
+
+class CountingDataset(MockDataset):
+    def __init__(self, values):
+        super().__init__(values)
+        self.segments: list[int] = []
+
+    def __getitem__(self, index):
+        # samples are loaded right before they are packed
+        self.segments.append(len(segments()))
+        return super().__getitem__(index)
+
+
+def test_benchmark_bounds_packed_samples():
+    import time
+
+    dataset = CountingDataset([np.zeros((256, 256), dtype=np.float32) for _ in range(40)])
+    workflow = Workflow('slow').add(lambda x: time.sleep(0.01) or float(x[0, 0]))
+    before = len(segments())
+    bench = Benchmark(Dataloader(dataset, batch_size=1), [workflow], processes=2, progress=False,
+                      transport=SharedMemoryTransport(min_bytes=1024))
+    bench.run_tests()
+    assert len(bench.results) == 40
+    # at most two chunks per worker are in flight
+    assert max(dataset.segments) - before <= 2 * 2
@@ -1,4 +1,10 @@
-from octopipes.workflow import Workflow
+import pytest
+import time
+import numpy as np
+
+from octopipes.cache import StepCache
+from octopipes.handlers import DefaultHandler
+from octopipes.workflow import Workflow, compile_requires
 
 
 def test_workflow():
@@ -59,3 +65,234 @@ def test_process_requires_with_dependencies():
         pass
     
     assert wf_iter.outputs[-1] == 'i' + 'input' + 'some_dep'
+
+
+def test_workflow_lean():
+    wf = Workflow('test_wf_1', lean=True)\
+            .add(lambda x: x + 1)\
+            .add(lambda x: x * 2)\
+            .add(lambda x: x + 3)\
+            .add(lambda x, y: x - y, requires='1')
+
+    wf_iter = wf(1)
+    outputs = []
+    for _ in wf_iter:
+        outputs.append(list(wf_iter.outputs))
+
+    # the output of the first step is required by the last one, the second one is only needed by the third step
+    assert outputs == [[2], [2, 4], [2, None, 7], [None, None, None, 5]]
+    assert wf_iter.freeze().output == 5
+    assert wf_iter.json_output() == '5'
+
+    wf = Workflow('test_wf_1', lean=True, keep=(0,))\
+            .add(lambda x: x + 1)\
+            .add(lambda x: x * 2)\
+            .add(lambda x: x + 3)
+    wf_iter = wf(1)
+    for _ in wf_iter:
+        pass
+    assert wf_iter.outputs == [2, None, 7]
+
+
+def test_workflow_from_steps():
+    wf = Workflow('test_wf_1', steps=[(lambda x: x + 1, DefaultHandler()), (lambda x: x * 2, DefaultHandler())])
+    wf_iter = wf(1)
+    for _ in wf_iter:
+        pass
+    assert wf_iter.outputs == [2, 4]
+
+
+def test_compile_requires():
+    assert compile_requires(None, 2) == ()
+    assert compile_requires('0,d1,2', 3) == ((False, 0), (True, 1), (False, 2))
+    # the previous output is injected automatically
+    assert compile_requires('0,2', 2) == ((False, 0),)
+
+    with pytest.raises(ValueError):
+        compile_requires('3', 2)
+    with pytest.raises(ValueError):
+        compile_requires('0,x', 2)
+    with pytest.raises(ValueError):
+        compile_requires('d', 2)
+
+    with pytest.raises(ValueError):
+        Workflow('test_wf_1').add(lambda x: x, requires='1')
+
+
+def test_missing_dependencies():
+    wf = Workflow('test_wf_1')\
+            .add(lambda x, y, z: x + y + z, requires='d0,d1')
+    assert wf.ndependencies == 2
+
+    with pytest.raises(ValueError):
+        wf(1, dependencies=[1])
+
+
+def test_workflow_batch():
+    calls = []
+
+    def batched_double(xs, ys):
+        calls.append(len(xs))
+        return [x * 2 + y for x, y in zip(xs, ys)]
+
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)\
+            .add(batched_double, requires='d0', batched=True)\
+            .add(lambda x, y: x - y, requires='0')
+
+    results = wf.run_batch([1, 2, 3], dependencies=[[10], [20], [30]])
+    assert calls == [3]
+    assert [r.output for r in results] == [13, 24, 35]
+    assert all(len(r.output_recap) == 3 for r in results)
+
+    # unbatched calls work with the same workflow
+    wf_iter = wf(1, dependencies=[10])
+    for _ in wf_iter:
+        pass
+    assert wf_iter.final_output == 13
+
+    assert wf.run_batch([]) == []
+
+
+def test_workflow_batch_stack():
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: x.sum(axis=(1, 2)), batched=True, stack=True)
+
+    runs = wf.batch([np.ones((2, 2)), np.zeros((2, 2))])
+    assert [run.final_output for run in runs] == [4, 0]
+
+    wf_iter = wf(np.ones((2, 2)))
+    for _ in wf_iter:
+        pass
+    assert wf_iter.final_output == 4
+
+    wf = Workflow('test_wf_1')\
+            .add(lambda xs: xs[:1], batched=True)
+    with pytest.raises(ValueError):
+        wf.batch([1, 2])
+
+
+def test_workflow_chain():
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)\
+            .add(lambda x: x * 10, requires='0', chain=False)\
+            .add(lambda x, y: x + y, requires='1')
+
+    wf_iter = wf(1)
+    for _ in wf_iter:
+        pass
+    assert wf_iter.outputs == [2, 10, 12]
+    assert wf.graph() == [set(), set(), {0, 1}]
+
+
+def test_workflow_run_parallel():
+    def branch(value):
+        def process(x):
+            time.sleep(0.2)
+            return x + value
+        return process
+
+    wf = Workflow('test_wf_1', lean=True)\
+            .add(lambda x: x * 2)\
+            .add(branch(1), requires='1', chain=False)\
+            .add(branch(2), requires='1', chain=False)\
+            .add(branch(3), requires='1', chain=False)\
+            .add(lambda x, y, z: x + y + z, requires='2,3')
+
+    start = time.perf_counter()
+    wf_iter = wf.run_parallel(1, max_workers=3)
+    assert time.perf_counter() - start < 0.5
+
+    assert wf_iter.final_output == 3 + 4 + 5
+    assert wf_iter.outputs == [None, None, None, None, 12]
+    assert wf_iter.durations[1] >= 0.2
+    result = wf_iter.freeze()
+    assert result.output == 12
+    assert result.current_step == 5
+
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: x + 1)\
+            .add(lambda x: 1 / x)
+    with pytest.raises(ZeroDivisionError):
+        wf.run_parallel(-1)
+
+
+def test_workflow_step_hooks():
+    calls = []
+
+    def before(run, step):
+        calls.append(('before', step, len(run.outputs)))
+        return step * 10
+
+    def after(run, step, output, token):
+        calls.append(('after', step, output, token))
+        return {'token': token} if step else None
+
+    cache = StepCache()
+    wf = Workflow('hooks')\
+        .add(lambda x: x + 1)\
+        .add(lambda x: x * 2, cache=cache)\
+        .add_step_hook(before=before, after=after)
+    run = wf(1)
+    assert [output for _, output in run] == [2, 4]
+    assert calls == [('before', 0, 0), ('after', 0, 2, 0), ('before', 1, 1), ('after', 1, 4, 10)]
+    assert run.step_metrics == [None, {'token': 10}]
+    recap = run.freeze().output_recap
+    assert 'token' not in recap[0] and recap[1]['token'] == 10 and recap[1]['cached'] is False
+    assert run.freeze(lazy=True).output_recap == recap
+
+    class Hook:
+        def before_step(self, run, step):
+            return None
+
+        def after_step(self, run, step, output, token):
+            return {'square': output ** 2}
+
+    wf = Workflow('parallel').add(lambda x: x + 1).add(lambda x: x * 2, requires='0', chain=False)\
+        .add_step_hook(Hook())
+    run = wf.run_parallel(3)
+    assert run.step_metrics == [{'square': 16}, {'square': 36}]
+
+    # the hooks of batched steps are called once for the whole batch
+    wf = Workflow('batch').add(lambda xs: [x + 1 for x in xs], batched=True)\
+        .add_step_hook(after=lambda run, step, outputs, token: {'batch': len(outputs)})
+    runs = wf.batch([1, 2])
+    assert [run.step_metrics for run in runs] == [[{'batch': 2}], [{'batch': 2}]]
+
+
+def test_workflow_compile():
+    cache = StepCache()
+    calls = []
+
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    wf = Workflow('test_wf')\
+        .add(lambda x: x + 1)\
+        .add(lambda x, first, dependency: x + first + dependency, requires='0,d1')\
+        .add(double, cache=cache)\
+        .add(lambda xs, firsts: [x * f for x, f in zip(xs, firsts)], requires='1', batched=True)\
+        .add(lambda a, b: (a, b), requires='2,4', chain=False)
+    run = wf(3, dependencies=[0, 10])
+    for _ in run:
+        pass
+
+    compiled = wf.compile()
+    assert compiled(3, [0, 10]) == run.current_output == (17, 136)
+    # the compiled workflow is reusable and goes through the caches of the steps
+    assert compiled(3, [0, 10]) == (17, 136)
+    assert calls == [17]
+    # only the input and the outputs consumed later are kept
+    assert compiled._nslots == 4
+
+    output, durations = wf.compile(timed=True)(3, [0, 10])
+    assert output == (17, 136)
+    assert len(durations) == 5 and all(d >= 0 for d in durations)
+
+    with pytest.raises(ValueError):
+        compiled(3, [0])
+    assert Workflow('empty').compile()(5) == 5
+    assert Workflow('chain').add(lambda x: x + 1).add(lambda x: x * 2).compile()(1, None) == 4
+    with pytest.raises(ValueError):
+        Workflow('hooked').add(lambda x: x).add_step_hook(before=lambda run, step: None).compile()
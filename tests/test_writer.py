@@ -0,0 +1,77 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from octopipes.aggregate_flows import DefaultAggregateFlowsFactory
+from octopipes.benchmark import Benchmark
+from octopipes.dataset import Dataloader
+from octopipes.handlers import BboxesHandler
+from octopipes.workflow import Workflow
+from octopipes.writer import ImageWriter
+
+from tests.test_dataset import MockDataset
+
+
+def test_image_writer(tmp_path):
+    image = np.full((8, 8, 3), 50, dtype=np.uint8)
+    with ImageWriter(max_workers=2, max_pending=2) as writer:
+        for i in range(5):
+            writer.submit(image, tmp_path / 'sub' / f'{i}.png')
+        writer.flush()
+        assert writer.pending == 0
+        assert (cv2.imread(str(tmp_path / 'sub' / '4.png')) == image).all()
+
+    with ImageWriter(ext='.jpg', quality=90) as writer:
+        writer.submit(image, tmp_path / 'image.png')
+    assert (tmp_path / 'image.jpg').exists()
+
+
+def test_image_writer_backpressure(tmp_path):
+    release = threading.Event()
+
+    class SlowHandler(BboxesHandler):
+        def output_on_image(self, image, output):
+            release.wait()
+            return image
+
+    writer = ImageWriter(max_workers=1, max_pending=1)
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    writer.submit_render(SlowHandler(), image, None, tmp_path / '0.png')
+    blocked = threading.Thread(target=writer.submit, args=(image, tmp_path / '1.png'))
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join()
+    writer.close()
+    assert (tmp_path / '1.png').exists()
+
+
+def test_image_writer_errors(tmp_path):
+    writer = ImageWriter()
+    writer.submit(np.zeros((8, 8, 3), dtype=np.uint8), tmp_path / 'image.unknown')
+    with pytest.raises(Exception):
+        writer.flush()
+    writer.flush()
+    writer.close()
+
+
+def test_output_on_image_writer(tmp_path):
+    writer = ImageWriter()
+
+    def save(wf_iter):
+        wf_iter.output_on_image(np.zeros((16, 16, 3), dtype=np.uint8),
+                                path=tmp_path / f'{wf_iter.input}.png', writer=writer)
+
+    wf = Workflow('test_wf_1')\
+            .add(lambda x: [[0, 0, x, x]], BboxesHandler())
+    dataloader = Dataloader(dataset=MockDataset([1, 2, 3, 4]), batch_size=2)
+    factory = DefaultAggregateFlowsFactory(hooks=[save])
+    benchmark = Benchmark(dataloader=dataloader, workflows=[wf], flows_factory=factory, processes=2)
+    benchmark.run_tests()
+
+    # the writers of the workers are flushed when the workers exit
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['1.png', '2.png', '3.png', '4.png']